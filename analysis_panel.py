@@ -0,0 +1,121 @@
+import math
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QSpinBox,
+                             QTableWidget, QTableWidgetItem, QHeaderView)
+
+from diagnostics import timed
+
+# Разрезы analytics.MONTH и analytics.WEEK; сам модуль (и NumPy) загружается при первом анализе
+PERIODS = [("По месяцам", "month"), ("По неделям", "week")]
+
+
+def _item(value, align_right=False):
+    item = QTableWidgetItem(value)
+    if align_right:
+        item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+    return item
+
+
+def _table(headers):
+    table = QTableWidget(0, len(headers))
+    table.setHorizontalHeaderLabels(headers)
+    table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+    table.verticalHeader().hide()
+    table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+    return table
+
+
+class AnalysisPanel(QWidget):
+    """Вкладка анализа затрат: итоги по периодам, доли категорий и крупнейшие статьи.
+
+    Платежи загружаются один раз на фильтр (analytics.load_payments, в фоне),
+    смена разреза или окна скользящего среднего пересчитывается по уже
+    загруженным столбцам без обращения к БД.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._columns = None
+        self.analysis = None
+
+        layout = QVBoxLayout(self)
+
+        controls = QHBoxLayout()
+        self.periodCombo = QComboBox()
+        for title, period in PERIODS:
+            self.periodCombo.addItem(title, period)
+        self.periodCombo.currentIndexChanged.connect(self.refresh)
+        self.windowSpin = QSpinBox()
+        self.windowSpin.setRange(1, 12)
+        self.windowSpin.setValue(3)
+        self.windowSpin.valueChanged.connect(self.refresh)
+        self.summaryLabel = QLabel()
+        controls.addWidget(self.periodCombo)
+        controls.addWidget(QLabel("Скользящее среднее, периодов:"))
+        controls.addWidget(self.windowSpin)
+        controls.addStretch()
+        controls.addWidget(self.summaryLabel)
+        layout.addLayout(controls)
+
+        tables = QHBoxLayout()
+        self.periodsTable = _table(["Период", "Платежей", "Сумма", "Скользящее среднее"])
+        tables.addWidget(self.periodsTable, 3)
+        right = QVBoxLayout()
+        self.categoriesTable = _table(["Категория", "Платежей", "Сумма", "Доля"])
+        self.topTable = _table(["Наименование", "Платежей", "Сумма"])
+        right.addWidget(self.categoriesTable)
+        right.addWidget(self.topTable)
+        tables.addLayout(right, 2)
+        layout.addLayout(tables)
+
+    def set_loading(self):
+        self.summaryLabel.setText("Загрузка...")
+
+    def set_columns(self, columns):
+        """Новые данные для анализа (analytics.PaymentColumns)"""
+        self._columns = columns
+        self.refresh()
+
+    def clear(self):
+        self._columns = None
+        self.analysis = None
+        for table in (self.periodsTable, self.categoriesTable, self.topTable):
+            table.setRowCount(0)
+        self.summaryLabel.setText("")
+
+    def refresh(self):
+        if self._columns is None:
+            return
+        import analytics
+        with timed("analysis.compute", rows=len(self._columns.days)):
+            self.analysis = analytics.analyse(self._columns, self.periodCombo.currentData(), self.windowSpin.value())
+        self.show_analysis(self.analysis)
+
+    def show_analysis(self, analysis):
+        periods = analysis.periods
+        average = analysis.total / len(periods.starts) if periods.starts else 0.0
+        self.summaryLabel.setText(
+            f"Платежей: {analysis.count}, на сумму {analysis.total:.2f} р., в среднем за период {average:.2f} р.")
+
+        date_format = "%m.%Y" if analysis.period == "month" else "%d.%m.%Y"
+        # Новые периоды сверху, как в списке платежей
+        self.periodsTable.setRowCount(len(periods.starts))
+        for row, index in enumerate(reversed(range(len(periods.starts)))):
+            moving = periods.moving_average[index]
+            values = [periods.starts[index].strftime(date_format), str(periods.counts[index]),
+                      f"{periods.amounts[index]:.2f}", "" if math.isnan(moving) else f"{moving:.2f}"]
+            for column, value in enumerate(values):
+                self.periodsTable.setItem(row, column, _item(value, column > 0))
+
+        self.categoriesTable.setRowCount(len(analysis.categories))
+        for row, share in enumerate(analysis.categories):
+            values = [share.название, str(share.количество), f"{share.сумма:.2f}", f"{share.доля:.1%}"]
+            for column, value in enumerate(values):
+                self.categoriesTable.setItem(row, column, _item(value, column > 0))
+
+        self.topTable.setRowCount(len(analysis.top_items))
+        for row, item in enumerate(analysis.top_items):
+            values = [item.наименование, str(item.количество), f"{item.сумма:.2f}"]
+            for column, value in enumerate(values):
+                self.topTable.setItem(row, column, _item(value, column > 0))
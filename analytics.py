@@ -0,0 +1,161 @@
+"""Анализ затрат в разрезе периодов и категорий.
+
+Платежи по фильтру загружаются в столбцы NumPy: дата - номер дня
+(date.toordinal), категория - небольшое целое, стоимость - целые копейки,
+наименование - номер в списке уникальных наименований. Итоги по месяцам и
+неделям, доли категорий, скользящее среднее и крупнейшие статьи затрат
+считаются векторно (bincount, cumsum), без цикла по платежам в Python,
+поэтому даже история в миллион платежей анализируется за десятки миллисекунд.
+"""
+from collections import namedtuple
+from datetime import date
+
+import numpy as np
+from sqlalchemy import BigInteger, Integer, cast, func, select, type_coerce
+
+from models import Платежи
+from queries import payment_conditions
+from reference_data import categories
+
+# Строки читаются из курсора порциями и сразу переводятся в массивы
+LOAD_CHUNK_SIZE = 50_000
+
+MONTH = "month"
+WEEK = "week"
+
+# Номер дня 01.01.1970 в счете date.toordinal - начало отсчета datetime64
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Платежи в столбцах: days - date.toordinal(), category_ids (0 - без категории),
+# kopecks - стоимость в копейках, name_codes - номера в списке names
+PaymentColumns = namedtuple("PaymentColumns", "days category_ids kopecks name_codes names")
+
+# Итоги по периодам подряд, включая периоды без платежей; суммы в рублях
+PeriodTotals = namedtuple("PeriodTotals", "starts counts amounts moving_average")
+
+CategoryShare = namedtuple("CategoryShare", "category_id название количество сумма доля")
+TopItem = namedtuple("TopItem", "наименование количество сумма")
+
+# Результат анализа: period - MONTH или WEEK, window - окно скользящего среднего в периодах
+Analysis = namedtuple("Analysis", "period window count total periods categories top_items")
+
+
+def _day_ordinal(dialect_name):
+    """Номер дня даты платежа в счете date.toordinal"""
+    if dialect_name == "sqlite":
+        # julianday('0001-01-01') = 1721425.5, а toordinal() этой даты - 1
+        return cast(func.julianday(Платежи.дата) - 1721424.5, Integer)
+    return type_coerce(Платежи.дата - date(1, 1, 1), Integer) + 1
+
+
+def load_payments(session, payment_filter):
+    """Платежи по фильтру в виде столбцов NumPy"""
+    query = select(
+        _day_ordinal(session.get_bind().dialect.name),
+        func.coalesce(Платежи.id_категории, 0),
+        cast(func.round(Платежи.стоимость * 100), BigInteger),
+        Платежи.наименование_платежа
+    ).where(*payment_conditions(payment_filter))
+
+    days, category_ids, kopecks, name_codes = [], [], [], []
+    name_index = {}
+    # Выполнение через Connection: строкам не нужна обработка ORM
+    result = session.connection().execute(query.execution_options(yield_per=LOAD_CHUNK_SIZE))
+    for partition in result.partitions():
+        chunk_days, chunk_categories, chunk_kopecks, chunk_names = zip(*partition)
+        days.append(np.array(chunk_days, dtype=np.int32))
+        category_ids.append(np.array(chunk_categories, dtype=np.int32))
+        kopecks.append(np.array(chunk_kopecks, dtype=np.int64))
+        name_codes.append(np.fromiter((name_index.setdefault(name, len(name_index)) for name in chunk_names),
+                                      dtype=np.int32, count=len(chunk_names)))
+
+    def column(parts, dtype):
+        return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+    return PaymentColumns(column(days, np.int32), column(category_ids, np.int32), column(kopecks, np.int64),
+                          column(name_codes, np.int32), list(name_index))
+
+
+def _period_numbers(days, period):
+    """Сквозной номер недели (с понедельника) или месяца для каждого дня"""
+    if period == WEEK:
+        # 01.01.0001 (день 1) - понедельник
+        return (days - 1) // 7
+    return (days - _EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def _period_start(number, period):
+    if period == WEEK:
+        return date.fromordinal(int(number) * 7 + 1)
+    year, month = divmod(int(number), 12)
+    return date(1970 + year, month + 1, 1)
+
+
+def moving_average(values, window):
+    """Скользящее среднее за window периодов; для первых window - 1 периодов - NaN"""
+    values = np.asarray(values, dtype=np.float64)
+    if window <= 1:
+        return values.copy()
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        cumulative = np.cumsum(np.concatenate(([0.0], values)))
+        result[window - 1:] = (cumulative[window:] - cumulative[:-window]) / window
+    return result
+
+
+def period_totals(columns, period=MONTH, window=3):
+    """Количество и сумма платежей по месяцам или неделям подряд, от первого платежа до последнего"""
+    if not len(columns.days):
+        empty = np.empty(0)
+        return PeriodTotals([], np.empty(0, dtype=np.int64), empty, empty)
+    numbers = _period_numbers(columns.days, period)
+    first = numbers.min()
+    offsets = numbers - first
+    size = int(offsets.max()) + 1
+    counts = np.bincount(offsets, minlength=size)
+    amounts = np.bincount(offsets, weights=columns.kopecks, minlength=size) / 100
+    starts = [_period_start(first + offset, period) for offset in range(size)]
+    return PeriodTotals(starts, counts, amounts, moving_average(amounts, window))
+
+
+def category_shares(columns, category_name=categories.name):
+    """Категории по убыванию суммы с долей в общей сумме"""
+    if not len(columns.category_ids):
+        return []
+    counts = np.bincount(columns.category_ids)
+    sums = np.bincount(columns.category_ids, weights=columns.kopecks)
+    total = sums.sum()
+    present = np.flatnonzero(counts)
+    present = present[np.argsort(-sums[present], kind="stable")]
+    return [
+        CategoryShare(int(category_id), category_name(int(category_id)) or "Без категории",
+                      int(counts[category_id]), float(sums[category_id]) / 100,
+                      float(sums[category_id] / total) if total else 0.0)
+        for category_id in present
+    ]
+
+
+def top_items(columns, limit=10):
+    """Наименования платежей с наибольшей суммой"""
+    if not columns.names:
+        return []
+    sums = np.bincount(columns.name_codes, weights=columns.kopecks, minlength=len(columns.names))
+    counts = np.bincount(columns.name_codes, minlength=len(columns.names))
+    limit = min(limit, len(sums))
+    # argpartition выбирает limit наибольших без полной сортировки всех наименований
+    top = np.argpartition(-sums, limit - 1)[:limit]
+    top = top[np.argsort(-sums[top], kind="stable")]
+    return [TopItem(columns.names[code], int(counts[code]), float(sums[code]) / 100) for code in top]
+
+
+def analyse(columns, period=MONTH, window=3, top=10, category_name=categories.name):
+    """Полный анализ загруженных платежей"""
+    return Analysis(
+        period,
+        window,
+        len(columns.days),
+        int(columns.kopecks.sum()) / 100,
+        period_totals(columns, period, window),
+        category_shares(columns, category_name),
+        top_items(columns, top)
+    )
@@ -0,0 +1,57 @@
+from sqlalchemy import select, update
+
+from models import Пользователи
+
+BCRYPT_PREFIXES = (b'$2a$', b'$2b$', b'$2y$')
+
+# Результаты проверки входа
+LOGIN_OK = "ok"
+UNKNOWN_USER = "unknown_user"
+WRONG_PIN = "wrong_pin"
+WRONG_PASSWORD = "wrong_password"
+
+
+def is_hashed(stored_password):
+    """Хранится ли пароль уже в виде bcrypt-хеша"""
+    return stored_password.encode('utf-8').startswith(BCRYPT_PREFIXES)
+
+
+def hash_password(password, rounds=12):
+    import bcrypt
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def verify_login(session, user_id, password, pin_code):
+    """Проверка пин-кода и пароля пользователя.
+
+    bcrypt намеренно медленный, поэтому функция вызывается вне потока
+    интерфейса. Пароль, еще хранящийся открытым текстом, при успешном входе
+    заменяется хешем (массово это делает hash_passwords.py).
+    """
+    user = session.execute(
+        select(Пользователи.пароль, Пользователи.пин_код).where(Пользователи.id == user_id)
+    ).first()
+    if user is None:
+        return UNKNOWN_USER
+
+    # Проверка пин-кода
+    if user.пин_код != pin_code:
+        return WRONG_PIN
+
+    # Проверка пароля; bcrypt загружается при первой проверке, а не при запуске приложения
+    if is_hashed(user.пароль):
+        import bcrypt
+        if not bcrypt.checkpw(password.encode('utf-8'), user.пароль.encode('utf-8')):
+            return WRONG_PASSWORD
+        return LOGIN_OK
+
+    # Если пароль в БД хранится в plaintext, сравниваем напрямую и обновляем на хешированный
+    if password != user.пароль:
+        return WRONG_PASSWORD
+    session.execute(
+        update(Пользователи)
+        .where(Пользователи.id == user_id, Пользователи.пароль == user.пароль)
+        .values(пароль=hash_password(password))
+    )
+    session.commit()
+    return LOGIN_OK
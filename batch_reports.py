@@ -0,0 +1,149 @@
+"""Пакетное формирование PDF-отчетов о платежах без графического интерфейса.
+
+Отчеты строятся тем же макетом, что и кнопка "Создать отчет", по одному на
+каждого пользователя и месяц. Задания выполняются параллельно в пуле
+процессов; у каждого процесса свое подключение к БД.
+
+Примеры:
+    python batch_reports.py --month 2024-05
+    python batch_reports.py --month 2024-04 --month 2024-05 --user-id 10 --workers 4 --output-dir отчеты
+"""
+import argparse
+import calendar
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from db import DB_URI, make_engine
+from models import Пользователи
+from queries import PaymentFilter
+from report import build_report, get_template
+from report_data import stream_report_rows
+
+# Подключение к БД процесса-исполнителя создается один раз на процесс
+_engine = None
+
+
+def _init_worker(url):
+    global _engine
+    _engine = make_engine(url, pool_size=1, max_overflow=0)
+    # Шрифт и стили отчета загружаются и прогреваются до первого задания
+    get_template().warm_up()
+
+
+def month_period(value):
+    """'2024-05' -> (date(2024, 5, 1), date(2024, 5, 31))"""
+    year, month = (int(part) for part in value.split("-"))
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def previous_month():
+    today = date.today()
+    year, month = (today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12)
+    return f"{year:04d}-{month:02d}"
+
+
+class _CountingRows:
+    """Итератор по строкам отчета со счетчиком и просмотром первой строки"""
+
+    def __init__(self, result):
+        self._iterator = iter(result)
+        self._first = next(self._iterator, None)
+        self.count = 0
+
+    def peek(self):
+        return self._first
+
+    def __iter__(self):
+        if self._first is not None:
+            self.count += 1
+            yield self._first
+        for row in self._iterator:
+            self.count += 1
+            yield row
+
+
+def render_job(job):
+    """Формирование одного отчета в процессе-исполнителе; возвращает (job, платежей, итог, секунд)"""
+    started = time.perf_counter()
+    payment_filter = PaymentFilter(job["user_id"], job["date_from"], job["date_to"])
+    with Session(_engine) as session:
+        rows = _CountingRows(stream_report_rows(session, payment_filter))
+        if rows.peek() is None:
+            return job, 0, 0.0, time.perf_counter() - started
+        subtitle = f"{job['fio']}, {job['date_from']:%d.%m.%Y} - {job['date_to']:%d.%m.%Y}"
+        total = build_report(job["filename"], rows, subtitle=subtitle, header=job["fio"])
+    return job, rows.count, total, time.perf_counter() - started
+
+
+def build_jobs(url, months, user_ids, output_dir):
+    engine = make_engine(url)
+    query = select(Пользователи.id, Пользователи.фио, Пользователи.логин).order_by(Пользователи.id)
+    if user_ids:
+        query = query.where(Пользователи.id.in_(user_ids))
+    with engine.connect() as connection:
+        users = connection.execute(query).all()
+    engine.dispose()
+
+    jobs = []
+    for month in months:
+        date_from, date_to = month_period(month)
+        for user in users:
+            jobs.append({
+                "user_id": user.id,
+                "fio": user.фио,
+                "date_from": date_from,
+                "date_to": date_to,
+                "filename": os.path.join(output_dir, f"Отчет_{user.логин}_{month}.pdf"),
+            })
+    return jobs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетное формирование отчетов о платежах")
+    parser.add_argument("--month", action="append", help="Месяц в формате ГГГГ-ММ (можно несколько раз), по умолчанию прошлый")
+    parser.add_argument("--user-id", type=int, action="append", help="id пользователя (можно несколько раз), по умолчанию все")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Количество процессов")
+    parser.add_argument("--output-dir", default="отчеты", help="Каталог для PDF-файлов")
+    parser.add_argument("--url", default=DB_URI, help="Строка подключения к БД")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers должно быть не меньше 1")
+
+    months = args.month or [previous_month()]
+    os.makedirs(args.output_dir, exist_ok=True)
+    jobs = build_jobs(args.url, months, args.user_id, args.output_dir)
+    # Без заданий пул все равно создается хотя бы с одним процессом
+    workers = max(1, min(args.workers, len(jobs)))
+    print(f"Заданий: {len(jobs)}, процессов: {workers}")
+
+    started = time.perf_counter()
+    done = skipped = failed = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(args.url,)) as pool:
+        futures = {pool.submit(render_job, job): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                _, count, total, elapsed = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"ОШИБКА  {job['filename']}: {e}")
+                continue
+            if count == 0:
+                skipped += 1
+                continue
+            done += 1
+            print(f"{elapsed:7.2f} с  {count:>7} платежей  {total:>12.2f} р.  {job['filename']}")
+
+    elapsed = time.perf_counter() - started
+    print(f"Готово: {done}, без платежей: {skipped}, ошибок: {failed}; общее время {elapsed:.1f} с")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
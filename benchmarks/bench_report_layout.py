@@ -0,0 +1,65 @@
+"""Время сборки и память PDF-отчета в зависимости от числа платежей.
+
+Каждый размер собирается в отдельном процессе, поэтому пиковый объем памяти
+процесса (ru_maxrss) относится только к этому отчету. Строки отчета
+синтетические (как в bench_report_template), БД не нужна; шаблон прогревается
+до замера.
+
+Запуск:
+    python -m benchmarks.bench_report_layout
+    python -m benchmarks.bench_report_layout --rows 1000 --rows 10000 --rows 100000 --keep-dir отчеты
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.bench_report_template import sample_rows
+from report import build_report, get_template
+
+DEFAULT_ROWS = [1_000, 10_000, 100_000]
+
+
+def measure(rows, filename):
+    """Сборка одного отчета в процессе-исполнителе: (страниц, секунд, пик памяти МБ, размер файла МБ)"""
+    get_template().warm_up()
+    data = sample_rows(rows)
+    pages = 0
+
+    def progress(page):
+        nonlocal pages
+        pages = page
+
+    started = time.perf_counter()
+    build_report(filename, data, subtitle="Иванов Иван Иванович", header="Иванов Иван Иванович", progress=progress)
+    elapsed = time.perf_counter() - started
+    # ru_maxrss в Linux - в килобайтах, в macOS - в байтах
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return pages, elapsed, peak, os.path.getsize(filename) / 1024 / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, action="append", help="Платежей в отчете (можно несколько раз)")
+    parser.add_argument("--keep-dir", help="Сохранить PDF-файлы в каталог")
+    args = parser.parse_args(argv)
+
+    directory = args.keep_dir or tempfile.mkdtemp(prefix="report_layout_")
+    os.makedirs(directory, exist_ok=True)
+    print(f"{'платежей':>9} {'страниц':>8} {'время, с':>9} {'строк/с':>8} {'память, МБ':>11} {'файл, МБ':>9}")
+    for rows in args.rows or DEFAULT_ROWS:
+        filename = os.path.join(directory, f"report_{rows}.pdf")
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            pages, elapsed, peak, size = pool.submit(measure, rows, filename).result()
+        print(f"{rows:>9} {pages:>8} {elapsed:>9.2f} {rows / elapsed:>8.0f} {peak:>11.1f} {size:>9.2f}")
+        if not args.keep_dir:
+            os.remove(filename)
+    if not args.keep_dir:
+        os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
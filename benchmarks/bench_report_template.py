@@ -0,0 +1,53 @@
+"""Накладные расходы на один отчет: новый шаблон на каждый отчет против общего.
+
+"До" - каждый отчет заново регистрирует DejaVuSan.ttf и создает стили
+(как раньше делал generate_report), "после" - все отчеты используют
+report.get_template(). Отчеты небольшие и собираются в память.
+
+Запуск:
+    python -m benchmarks.bench_report_template --reports 50 --rows 20
+"""
+import argparse
+import io
+import time
+from datetime import date
+
+from report import ReportTemplate, build_report, get_template
+from report_data import ReportRow
+
+
+def sample_rows(count):
+    categories = ["Коммунальные платежи", "Автомобиль", "Питание и быт", "Медицина"]
+    rows = []
+    for category_index, category in enumerate(categories):
+        items = [(f"Платеж {i}", 100.0 + i) for i in range(category_index, count, len(categories))]
+        category_total = sum(amount for _, amount in items)
+        rows.extend(ReportRow(category_index + 1, category, date(2024, 5, 1), name, amount, category_total, 0.0)
+                    for name, amount in items)
+    return rows
+
+
+def run(reports, rows, make_template):
+    data = sample_rows(rows)
+    started = time.perf_counter()
+    for _ in range(reports):
+        build_report(io.BytesIO(), data, make_template())
+    return (time.perf_counter() - started) / reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reports", type=int, default=50, help="Количество отчетов в каждом замере")
+    parser.add_argument("--rows", type=int, default=20, help="Платежей в одном отчете")
+    args = parser.parse_args(argv)
+
+    before = run(args.reports, args.rows, ReportTemplate)
+    get_template().warm_up()
+    after = run(args.reports, args.rows, get_template)
+    print(f"Новый шаблон на каждый отчет: {before * 1000:8.2f} мс/отчет")
+    print(f"Общий прогретый шаблон:       {after * 1000:8.2f} мс/отчет")
+    print(f"Ускорение: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
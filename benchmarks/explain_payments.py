@@ -0,0 +1,83 @@
+"""Проверка планов запроса списка платежей на большом синтетическом наборе.
+
+Заполняет схему Проект2 синтетическими платежами (benchmarks/synthetic.py),
+применяет миграции, собирает статистику и выводит
+EXPLAIN ANALYZE для запроса из payments_query (с фильтром по категории и без),
+для постраничных запросов payments_page_query из середины истории и для
+поиска по наименованию.
+Проверка не проходит, если по таблице платежей выполняется Seq Scan.
+
+Запуск (только на отдельной тестовой БД - данные добавляются в таблицы):
+    python -m benchmarks.explain_payments --url postgresql+psycopg2://... --rows 2000000
+"""
+import argparse
+import json
+import sys
+from datetime import date
+
+from sqlalchemy import text
+
+import migrations
+from benchmarks import synthetic
+from queries import PaymentFilter, payments_query, payments_page_query
+
+USERS = 1000
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def explain(engine, query):
+    compiled = query.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as connection:
+        result = connection.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {compiled}"))
+        return result.scalar()[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", required=True, help="Строка подключения к тестовой БД PostgreSQL")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Количество синтетических платежей")
+    parser.add_argument("--skip-fill", action="store_true", help="Не добавлять данные, только EXPLAIN")
+    args = parser.parse_args(argv)
+
+    engine = synthetic.make_bench_engine(args.url)
+    synthetic.prepare_schema(engine)
+    if not args.skip_fill:
+        synthetic.generate(engine, args.rows, USERS)
+    with engine.connect() as connection:
+        if not migrations.search_index_exists(connection):
+            print("Индекс поиска не создан (нет расширений pg_trgm, btree_gin): "
+                  "поиск по наименованию перебирает платежи пользователя")
+
+    period = PaymentFilter(42, date(2023, 1, 1), date(2023, 12, 31))
+    period_category = PaymentFilter(42, date(2023, 1, 1), date(2023, 12, 31), 3)
+    # Поиск по подстроке за все годы (триграммный индекс)
+    search = PaymentFilter(42, date(2020, 1, 1), date(2024, 12, 31), search="столов")
+    # Ключ (дата, id) из середины периода - страница не должна перебирать предыдущие
+    middle = (date(2023, 7, 1), 2 ** 31 - 1)
+    cases = {
+        "период": payments_query(period),
+        "период и категория": payments_query(period_category),
+        "следующая страница": payments_page_query(period, 201, after=middle),
+        "предыдущая страница": payments_page_query(period, 201, before=middle),
+        "следующая страница с категорией": payments_page_query(period_category, 201, after=middle),
+        "поиск по наименованию": payments_page_query(search, 201),
+    }
+    ok = True
+    for name, query in cases.items():
+        plan = explain(engine, query)
+        nodes = [node for node in plan_nodes(plan["Plan"]) if node.get("Relation Name") == "платежи"]
+        scans = [f'{node["Node Type"]} ({node.get("Index Name", "-")})' for node in nodes]
+        print(f"{name}: {', '.join(scans)}; время выполнения {plan['Execution Time']:.2f} мс")
+        if any(node["Node Type"] == "Seq Scan" for node in nodes):
+            ok = False
+            print(json.dumps(plan, ensure_ascii=False, indent=2))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""Долгий прогон: память процесса за тысячи циклов смены фильтра, добавления и удаления.
+
+Каждый цикл повторяет то, что окно app5.py делает за рабочий день:
+    фильтр   - случайный пользователь, период и категория; первая страница
+               списка, следующая страница и итоги читаются в фоне через
+               QueryExecutor в модель таблицы, как в load_data;
+    добавление и удаление - платеж в session_scope, строка вставляется в
+               модель и удаляется из нее, как в диалогах окна.
+Через каждые --sample циклов выводятся размер процесса (RSS), число
+объектов Python, живых сессий и объектов ORM. Проверка не проходит, если
+RSS после прогрева вырос больше чем на --max-growth МБ или в памяти остались
+сессии и объекты ORM.
+
+Запуск (только на отдельной тестовой БД - данные добавляются в таблицы):
+    python -m benchmarks.soak --url sqlite:///soak.db --payments 100000
+    python -m benchmarks.soak --url postgresql+psycopg2://... --skip-fill --cycles 10000
+"""
+import argparse
+import gc
+import os
+import random
+import resource
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from PyQt6.QtCore import QCoreApplication, QEventLoop
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session as OrmSession
+
+import db
+from benchmarks import synthetic
+from diagnostics import diagnostics
+from models import Base, Пользователи
+from payment_model import PaymentTableModel
+from queries import PaymentFilter, payment_matches
+from reference_data import categories
+from rollup import category_totals
+from workers import QueryExecutor
+
+PERIODS = (7, 31, 92, 366)
+
+
+def rss_mb():
+    """Текущий размер процесса; где нет /proc - пиковый"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def live_objects():
+    """(объектов Python, сессий, объектов ORM) после сборки мусора"""
+    gc.collect()
+    objects = gc.get_objects()
+    sessions = sum(1 for item in objects if isinstance(item, OrmSession))
+    instances = sum(1 for item in objects if isinstance(item, Base))
+    return len(objects), sessions, instances
+
+
+def wait(executor, fn):
+    """Запуск fn(session) в фоне и ожидание результата, как его получает окно"""
+    loop = QEventLoop()
+    outcome = {}
+
+    def done(result):
+        outcome["result"] = result
+        loop.quit()
+
+    def failed(message):
+        outcome["error"] = message
+        loop.quit()
+
+    executor.submit(fn, done, failed)
+    loop.exec()
+    if "error" in outcome:
+        raise RuntimeError(outcome["error"])
+    return outcome["result"]
+
+
+def dataset():
+    """(число пользователей, id категорий) тестовой БД"""
+    with db.session_scope() as session:
+        users = session.execute(select(func.max(Пользователи.id))).scalar()
+        return users, [category_id for category_id, _ in categories.items(session)]
+
+
+def run_cycle(rng, users, category_ids, model, page_executor, summary_executor):
+    user_id = rng.randint(1, users)
+    first_day = synthetic.FIRST_DAY + timedelta(days=rng.randrange(synthetic.DAYS))
+    payment_filter = PaymentFilter(user_id, first_day, first_day + timedelta(days=rng.choice(PERIODS)),
+                                   rng.choice([None, *category_ids]))
+
+    def fetch_next(after, on_done, on_failed):
+        on_done(wait(page_executor, lambda session: db.payments_page(
+            session, payment_filter, PaymentTableModel.CHUNK_SIZE, after)))
+
+    model.set_page(wait(page_executor, lambda session: db.payments_page(
+        session, payment_filter, PaymentTableModel.CHUNK_SIZE)), fetch_next)
+    if model.canFetchMore():
+        model.fetchMore()
+    wait(summary_executor, lambda session: category_totals(session, payment_filter))
+
+    category_id = rng.choice(category_ids)
+    with db.session_scope() as session:
+        payment = db.add_payment(session, user_id, category_id, "Проверка", 1, Decimal("100.00"), date.today())
+    if payment_matches(payment_filter, user_id, payment.дата, category_id, payment.наименование_платежа):
+        model.insert_payment(payment)
+    with db.session_scope() as session:
+        db.delete_payments(session, user_id, [payment.id])
+    model.remove_payments([payment.id])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Память процесса за тысячи циклов работы с платежами")
+    parser.add_argument("--url", default="sqlite:///benchmark.db", help="Тестовая БД: PostgreSQL или файл SQLite")
+    parser.add_argument("--payments", type=int, default=100_000, help="Количество синтетических платежей")
+    parser.add_argument("--users", type=int, help="Количество пользователей (по умолчанию 1 на 1000 платежей)")
+    parser.add_argument("--skip-fill", action="store_true", help="Использовать уже сгенерированные данные")
+    parser.add_argument("--cycles", type=int, default=3000, help="Циклов фильтр + добавление + удаление")
+    parser.add_argument("--warmup", type=int, default=300, help="Циклов прогрева (кеши, пул соединений)")
+    parser.add_argument("--sample", type=int, default=250, help="Замер памяти через каждые N циклов")
+    parser.add_argument("--max-growth", type=float, default=10.0, help="Допустимый рост RSS после прогрева, МБ")
+    parser.add_argument("--seed", type=int, default=1, help="Начальное значение выбора фильтров")
+    args = parser.parse_args(argv)
+
+    app = QCoreApplication(sys.argv)
+    engine = synthetic.make_bench_engine(args.url)
+    db.configure(engine)
+    # Журнал событий диагностики ограничен по длине - в прогоне он работает, как в окне
+    diagnostics.install(engine)
+    users = args.users or min(10_000, max(10, args.payments // 1000))
+    if not args.skip_fill:
+        print(f"Генерация данных: {args.payments} платежей, {users} пользователей")
+        synthetic.prepare_schema(engine)
+        synthetic.generate(engine, args.payments, users)
+    users, category_ids = dataset()
+
+    model = PaymentTableModel(categories.name)
+    page_executor = QueryExecutor(db.Session, app)
+    summary_executor = QueryExecutor(db.Session, app)
+    rng = random.Random(args.seed)
+
+    print(f"{engine.dialect.name}: {args.cycles} циклов, прогрев {args.warmup}")
+    print(f"{'цикл':>7} {'RSS, МБ':>9} {'объектов':>10} {'сессий':>7} {'ORM':>5} {'мс/цикл':>8}")
+    baseline = None
+    started = time.perf_counter()
+    for cycle in range(1, args.cycles + 1):
+        run_cycle(rng, users, category_ids, model, page_executor, summary_executor)
+        if cycle == args.warmup or cycle % args.sample == 0 or cycle == args.cycles:
+            elapsed = time.perf_counter() - started
+            objects, sessions, instances = live_objects()
+            rss = rss_mb()
+            if cycle == args.warmup:
+                baseline = rss
+            mark = "  прогрев" if cycle <= args.warmup else ""
+            print(f"{cycle:>7} {rss:>9.1f} {objects:>10} {sessions:>7} {instances:>5} "
+                  f"{elapsed * 1000 / cycle:>8.2f}{mark}")
+
+    growth = rss - baseline if baseline is not None else 0.0
+    print(f"Рост RSS после прогрева: {growth:.1f} МБ (допустимо {args.max_growth:.1f})")
+    if growth > args.max_growth or sessions or instances:
+        print("ПРОВЕРКА НЕ ПРОЙДЕНА")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
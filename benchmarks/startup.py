@@ -0,0 +1,125 @@
+"""Холодный запуск app5.py: время до окна входа и до загрузки списка логинов.
+
+Каждый замер выполняется в отдельном процессе Python, чтобы импорт модулей
+был холодным. Замеряется время от запуска процесса:
+    импорт   - загрузка app5 и его зависимостей;
+    окно     - окно входа отображено;
+    логины   - список логинов загружен из БД (если БД доступна).
+Дополнительно проверяется, что reportlab, bcrypt и numpy не загружаются при запуске,
+и выводится профиль импорта (python -X importtime) по пакетам.
+
+Запуск:
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --runs 0 --imports 20     # только профиль импорта
+Без дисплея используется платформа Qt offscreen.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Выполняется в дочернем процессе; время отсчитывается от запуска процесса (PROCESS_STARTED)
+DRIVER = r"""
+import json, os, sys, time
+started = float(os.environ["PROCESS_STARTED"])
+marks = {}
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QApplication, QComboBox, QMessageBox
+import app5
+marks["импорт"] = time.time() - started
+errors = []
+QMessageBox.critical = staticmethod(lambda parent, title, text, *a, **k: errors.append(text))
+app = QApplication(sys.argv)
+timeout = float(os.environ.get("LOGINS_TIMEOUT", "10"))
+
+def window_shown():
+    dialog = QApplication.activeModalWidget()
+    if dialog is None:
+        QTimer.singleShot(1, window_shown)
+        return
+    marks["окно"] = time.time() - started
+    marks["lazy"] = {name: name in sys.modules for name in ("reportlab", "bcrypt", "numpy")}
+    combo = dialog.findChild(QComboBox)
+
+    def wait_logins():
+        if combo.count():
+            marks["логины"] = time.time() - started
+        elif not errors and time.time() - started < marks["окно"] + timeout:
+            QTimer.singleShot(2, wait_logins)
+            return
+        dialog.reject()
+    wait_logins()
+
+QTimer.singleShot(0, window_shown)
+app5.PaymentApp()
+marks["ошибки"] = errors
+print("STARTUP " + json.dumps(marks, ensure_ascii=False))
+"""
+
+
+def run_once(env):
+    env = dict(env, PROCESS_STARTED=repr(time.time()))
+    output = subprocess.run([sys.executable, "-c", DRIVER], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    for line in output.splitlines():
+        if line.startswith("STARTUP "):
+            return json.loads(line[len("STARTUP "):])
+    raise RuntimeError("Дочерний процесс не вернул замеры")
+
+
+def import_profile(env, top):
+    """Собственное время импорта модулей, сгруппированное по пакетам верхнего уровня"""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app5"], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stderr
+    packages = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        packages[name.strip().split(".")[0]] += int(self_us)
+    total = sum(packages.values())
+    print(f"Профиль импорта app5: всего {total / 1000:.0f} мс")
+    for name, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {name:<24} {self_us / 1000:8.1f} мс  {self_us / total:6.1%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Время холодного запуска приложения")
+    parser.add_argument("--runs", type=int, default=5, help="Количество запусков")
+    parser.add_argument("--imports", type=int, default=15, help="Сколько пакетов показать в профиле импорта (0 - без профиля)")
+    parser.add_argument("--url", help="Строка подключения к БД (по умолчанию PROJECT2_DB_URI или db.DB_URI)")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    if args.url:
+        env["PROJECT2_DB_URI"] = args.url
+
+    if args.imports:
+        import_profile(env, args.imports)
+
+    runs = [run_once(env) for _ in range(args.runs)]
+    if not runs:
+        return 0
+    print(f"Запусков: {len(runs)}")
+    for mark in ("импорт", "окно", "логины"):
+        values = [run[mark] * 1000 for run in runs if mark in run]
+        if values:
+            print(f"  {mark:<8} медиана {statistics.median(values):7.0f} мс, минимум {min(values):7.0f} мс")
+        else:
+            print(f"  {mark:<8} нет данных")
+    lazy = runs[0]["lazy"]
+    print("Загружены до окна входа: " + ", ".join(f"{name} - {'да' if loaded else 'нет'}" for name, loaded in lazy.items()))
+    if runs[0]["ошибки"]:
+        print("Ошибки: " + "; ".join(runs[0]["ошибки"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
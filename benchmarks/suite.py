@@ -0,0 +1,227 @@
+"""Замеры основных сценариев приложения без интерфейса.
+
+Сценарии повторяют то, что делает app5.py:
+    load_page    - первая страница списка и итоги за год (load_data)
+    scroll_page  - страница из середины истории по ключу (прокрутка таблицы)
+    insert       - добавление одного платежа с фиксацией (диалог добавления)
+    bulk_delete  - удаление 100 платежей одним запросом (delete_payment)
+    report       - PDF-отчет за год по всему фильтру в память (generate_report)
+    login        - проверка пароля bcrypt и пин-кода (окно входа)
+    analytics    - загрузка всей истории пользователя в столбцы и анализ затрат (вкладка "Анализ")
+
+Результаты выводятся таблицей и сохраняются в JSON (--output) вместе с
+версией кода и параметрами, чтобы сравнивать версии между собой (--compare).
+
+Запуск (только на отдельной тестовой БД - данные добавляются в таблицы):
+    python -m benchmarks.suite --url sqlite:///bench.db --payments 100000 --output base.json
+    python -m benchmarks.suite --url postgresql+psycopg2://... --payments 10000000
+    python -m benchmarks.suite --url sqlite:///bench.db --skip-fill --compare base.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import delete, func, insert, select, update
+
+import analytics
+import db
+from auth import hash_password, verify_login
+from benchmarks import synthetic
+from models import Платежи, Пользователи
+from payment_model import PaymentTableModel
+from queries import PaymentFilter
+from report import build_report, get_template
+from report_data import stream_report_rows
+from rollup import category_totals
+
+LOGIN_USER_ID = 1
+LOGIN_PASSWORD = "password1"
+DELETE_BATCH = 100
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        "n": len(timings),
+        "mean_ms": round(statistics.fmean(timings) * 1000, 3),
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 3),
+        "min_ms": round(timings[0] * 1000, 3),
+        "max_ms": round(timings[-1] * 1000, 3),
+    }
+
+
+def measure(fn, repeat, prepare=None):
+    """Время выполнения fn(); prepare() готовит данные и в замер не входит"""
+    timings = []
+    for _ in range(repeat):
+        argument = prepare() if prepare is not None else None
+        started = time.perf_counter()
+        fn(argument) if prepare is not None else fn()
+        timings.append(time.perf_counter() - started)
+    return summarize(timings)
+
+
+def year_filter(user_id):
+    return PaymentFilter(user_id, date(2023, 1, 1), date(2023, 12, 31))
+
+
+def run_cases(users, repeat, rounds, rng):
+    results = {}
+
+    def user_ids():
+        return rng.randint(1, users)
+
+    def load_page():
+        payment_filter = year_filter(user_ids())
+        with db.session_scope() as session:
+            db.payments_page(session, payment_filter, PaymentTableModel.CHUNK_SIZE)
+        with db.session_scope() as session:
+            category_totals(session, payment_filter)
+    results["load_page"] = measure(load_page, repeat)
+
+    def scroll_page():
+        payment_filter = year_filter(user_ids())
+        with db.session_scope() as session:
+            db.payments_page(session, payment_filter, PaymentTableModel.CHUNK_SIZE, after=(date(2023, 7, 1), 2 ** 31 - 1))
+    results["scroll_page"] = measure(scroll_page, repeat)
+
+    added = []
+
+    def add():
+        with db.session_scope() as session:
+            added.append(db.add_payment(session, user_ids(), 3, "Еда", 1, Decimal("100.00")).id)
+    results["insert"] = measure(add, repeat)
+    # Добавленные платежи не должны накапливаться от прогона к прогону
+    with db.session_scope() as session:
+        session.execute(delete(Платежи).where(Платежи.id.in_(added)))
+
+    def prepare_delete():
+        user_id = user_ids()
+        with db.session_scope() as session:
+            session.execute(insert(Платежи), [
+                {"id_пользователя": user_id, "дата": date.today(), "id_категории": 3,
+                 "наименование_платежа": "Еда", "количество": 1, "цена": Decimal("100.00")}
+                for _ in range(DELETE_BATCH)
+            ])
+            ids = session.execute(
+                select(Платежи.id).where(Платежи.id_пользователя == user_id)
+                .order_by(Платежи.id.desc()).limit(DELETE_BATCH)
+            ).scalars().all()
+        return user_id, ids
+
+    def bulk_delete(argument):
+        user_id, ids = argument
+        with db.session_scope() as session:
+            db.delete_payments(session, user_id, ids)
+    results["bulk_delete"] = measure(bulk_delete, repeat, prepare_delete)
+
+    template = get_template()
+    template.warm_up()
+
+    def report():
+        with db.session_scope() as session:
+            build_report(io.BytesIO(), stream_report_rows(session, year_filter(user_ids())), template)
+    results["report"] = measure(report, rounds)
+
+    def login():
+        with db.session_scope() as session:
+            if verify_login(session, LOGIN_USER_ID, LOGIN_PASSWORD, 100000 + LOGIN_USER_ID) != "ok":
+                raise RuntimeError("Проверка входа не прошла")
+    results["login"] = measure(login, rounds)
+
+    def analysis():
+        payment_filter = PaymentFilter(user_ids(), synthetic.FIRST_DAY, date(2100, 1, 1))
+        with db.session_scope() as session:
+            analytics.analyse(analytics.load_payments(session, payment_filter), category_name=str)
+    results["analytics"] = measure(analysis, rounds)
+    return results
+
+
+def code_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    """Сравнение медиан с сохраненным прогоном; True, если есть замедление больше threshold"""
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    print(f"Сравнение с {baseline_path} (версия {baseline.get('version')}):")
+    regressed = False
+    for name, stats in results.items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        ratio = stats["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+        mark = "  ЗАМЕДЛЕНИЕ" if ratio > threshold else ""
+        regressed = regressed or ratio > threshold
+        print(f"  {name:<12} {old['median_ms']:10.2f} -> {stats['median_ms']:10.2f} мс  x{ratio:.2f}{mark}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры сценариев приложения на синтетических данных")
+    parser.add_argument("--url", default="sqlite:///benchmark.db", help="Тестовая БД: PostgreSQL или файл SQLite")
+    parser.add_argument("--payments", type=int, default=100_000, help="Количество синтетических платежей (10 тыс. - 10 млн)")
+    parser.add_argument("--users", type=int, help="Количество пользователей (по умолчанию 1 на 1000 платежей)")
+    parser.add_argument("--skip-fill", action="store_true", help="Использовать уже сгенерированные данные")
+    parser.add_argument("--repeat", type=int, default=50, help="Повторов для быстрых сценариев")
+    parser.add_argument("--rounds", type=int, default=10, help="Повторов для отчета и входа")
+    parser.add_argument("--seed", type=int, default=1, help="Начальное значение выбора пользователей")
+    parser.add_argument("--output", help="Файл для результатов в JSON")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Допустимое замедление медианы при сравнении")
+    args = parser.parse_args(argv)
+
+    engine = synthetic.make_bench_engine(args.url)
+    db.configure(engine)
+    users = args.users or min(10_000, max(10, args.payments // 1000))
+    if not args.skip_fill:
+        print(f"Генерация данных: {args.payments} платежей, {users} пользователей")
+        synthetic.prepare_schema(engine)
+        synthetic.generate(engine, args.payments, users)
+    with db.session_scope() as session:
+        users = session.execute(select(func.max(Пользователи.id))).scalar()
+        payments = session.execute(select(func.count()).select_from(Платежи)).scalar()
+        # Пароль пользователя для сценария входа хранится bcrypt-хешем, как после hash_passwords.py
+        session.execute(update(Пользователи).where(Пользователи.id == LOGIN_USER_ID)
+                        .values(пароль=hash_password(LOGIN_PASSWORD)))
+
+    results = run_cases(users, args.repeat, args.rounds, random.Random(args.seed))
+    report = {
+        "version": code_version(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "database": engine.dialect.name,
+        "payments": payments,
+        "users": users,
+        "python": platform.python_version(),
+        "results": results,
+    }
+
+    print(f"{engine.dialect.name}: {payments} платежей, {users} пользователей")
+    for name, stats in results.items():
+        print(f"  {name:<12} медиана {stats['median_ms']:9.2f} мс  p95 {stats['p95_ms']:9.2f} мс  (n={stats['n']})")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены: {args.output}")
+    if args.compare and compare(results, args.compare, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
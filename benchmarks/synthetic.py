@@ -0,0 +1,133 @@
+"""Синтетические пользователи, категории и платежи для замеров производительности.
+
+Строки генерируются на стороне СУБД одним INSERT ... SELECT на порцию
+(generate_series в PostgreSQL, рекурсивный CTE в SQLite), поэтому даже
+10 млн платежей не проходят через Python. Наименования и цены взяты по
+образцу zapolnenie.txt, даты равномерно распределены по FIRST_DAY + DAYS.
+
+Только для отдельной тестовой БД: данные добавляются в рабочие таблицы.
+"""
+import time
+from datetime import date
+
+from sqlalchemy import create_engine, event, make_url, text
+from sqlalchemy.pool import StaticPool
+
+import db
+import migrations
+from models import Base
+
+FIRST_DAY = date(2020, 1, 1)
+DAYS = 5 * 365
+CHUNK_ROWS = 1_000_000
+
+CATEGORIES = [
+    (1, "Коммунальные платежи"),
+    (2, "Автомобиль"),
+    (3, "Питание и быт"),
+    (4, "Медицина"),
+    (5, "Разное"),
+]
+
+# (категория, наименование, базовая цена); частые платежи повторяются
+PAYMENT_NAMES = [
+    (1, "Квартплата", 3000), (1, "Электроэнергия", 900), (1, "Водоснабжение", 600),
+    (1, "Газоснабжение", 400), (1, "Интернет", 500), (1, "Мобильный", 350),
+    (2, "Бензин", 2500), (2, "Бензин", 2500), (2, "Взнос за гараж", 1500), (2, "Мойка автомобиля", 500),
+    (3, "Еда", 800), (3, "Еда", 800), (3, "Еда", 800), (3, "Еда", 800), (3, "Столовая", 300),
+    (3, "Столовая", 300), (3, "Гипермаркет", 2500), (3, "Макароны", 90), (3, "Творог и сметана", 250),
+    (4, "Прием врача", 1500), (4, "Прием врача", 1500), (4, "Лекарства", 700), (4, "Анализы", 1200),
+    (4, "ЭКГ", 900), (5, "Одежда", 3000), (5, "Туфли", 4000), (5, "Маникюр", 1500), (5, "Маркеры", 200),
+]
+
+
+def make_bench_engine(url):
+    """Движок для замеров; для SQLite файл подключается как схема Проект2"""
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite":
+        return db.make_engine(url, statement_timeout=0)
+    path = url.database or ":memory:"
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def attach(dbapi_connection, _):
+        dbapi_connection.execute('ATTACH DATABASE ? AS "Проект2"', (path,))
+        db.register_sqlite_functions(dbapi_connection)
+
+    return engine
+
+
+def _series(dialect_name):
+    """CTE g(x) с числами от :start до :stop"""
+    if dialect_name == "postgresql":
+        return "g(x) AS (SELECT generate_series(CAST(:start AS INTEGER), CAST(:stop AS INTEGER)))"
+    return "g(x) AS (SELECT :start UNION ALL SELECT x + 1 FROM g WHERE x < :stop)"
+
+
+def _payment_date(dialect_name):
+    if dialect_name == "postgresql":
+        return "CAST(:first_day AS DATE) + (x * 7919) % :days"
+    return "date(:first_day, '+' || ((x * 7919) % :days) || ' days')"
+
+
+def _insert_ignore(dialect_name, statement):
+    if dialect_name == "postgresql":
+        return statement + " ON CONFLICT DO NOTHING"
+    return statement.replace("INSERT INTO", "INSERT OR IGNORE INTO", 1)
+
+
+def prepare_schema(engine):
+    """Таблицы, индексы и свертка - как на рабочей БД"""
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as connection:
+            connection.execute(text('CREATE SCHEMA IF NOT EXISTS "Проект2"'))
+    Base.metadata.create_all(engine)
+    migrations.upgrade(engine)
+
+
+def generate(engine, payments, users, progress=print):
+    """Добавление users пользователей (id 1..users), категорий и payments платежей"""
+    dialect_name = engine.dialect.name
+    names = ", ".join(
+        f"({number}, {category_id}, '{name}', {price}.0)"
+        for number, (category_id, name, price) in enumerate(PAYMENT_NAMES)
+    )
+    with engine.begin() as connection:
+        connection.execute(text(_insert_ignore(
+            dialect_name, 'INSERT INTO "Проект2"."категории" (id, название) VALUES (:id, :name)'
+        )), [{"id": category_id, "name": name} for category_id, name in CATEGORIES])
+        connection.execute(text(_insert_ignore(dialect_name, f"""
+            WITH RECURSIVE {_series(dialect_name)}
+            INSERT INTO "Проект2"."пользователи" (id, фио, логин, пароль, пин_код)
+            SELECT x, 'Пользователь ' || x, 'user' || x, 'password' || x, 100000 + x FROM g
+        """)), {"start": 1, "stop": users})
+
+    started = time.perf_counter()
+    for start in range(1, payments + 1, CHUNK_ROWS):
+        stop = min(start + CHUNK_ROWS - 1, payments)
+        with engine.begin() as connection:
+            connection.execute(text(f"""
+                WITH RECURSIVE {_series(dialect_name)},
+                names(n, id_категории, наименование, цена) AS (VALUES {names})
+                INSERT INTO "Проект2"."платежи"
+                    (id_пользователя, дата, id_категории, наименование_платежа, количество, цена)
+                SELECT p.id_пользователя, p.дата, p.id_категории, p.наименование, p.количество, p.цена
+                FROM (
+                    SELECT 1 + (x * 31) % :users AS id_пользователя,
+                           {_payment_date(dialect_name)} AS дата,
+                           names.id_категории, names.наименование,
+                           CASE WHEN x % 10 < 7 THEN 1 ELSE 1 + x % 4 END AS количество,
+                           ROUND(names.цена * (50 + (x * 37) % 100) / 100.0, 2) AS цена
+                    FROM g JOIN names ON names.n = (x * 13) % :name_count
+                ) AS p
+            """), {"start": start, "stop": stop, "users": users, "first_day": FIRST_DAY.isoformat(),
+                   "days": DAYS, "name_count": len(PAYMENT_NAMES)})
+        progress(f"  платежей добавлено: {stop} из {payments} ({time.perf_counter() - started:.0f} с)")
+
+    if dialect_name == "postgresql":
+        # VACUUM обновляет карту видимости - без нее Index Only Scan невозможен
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text('VACUUM ANALYZE "Проект2"."платежи"'))
+    else:
+        with engine.begin() as connection:
+            connection.execute(text('ANALYZE "Проект2"'))
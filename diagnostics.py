@@ -0,0 +1,156 @@
+"""Замеры времени горячих путей приложения.
+
+Действия (загрузка списка, добавление, удаление, вход, отчет) оборачиваются
+в timed(); время каждого SQL-запроса и число строк снимается через события
+SQLAlchemy и приписывается действиям, выполняющимся в том же потоке.
+Последние события хранятся в памяти (их показывает панель диагностики),
+при заданной переменной PROJECT2_DIAGNOSTICS_LOG они пишутся в журнал -
+по одной JSON-строке на событие. Для одного следующего действия можно
+включить профилирование cProfile (profile_next_action).
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event
+
+logger = logging.getLogger("project2.diagnostics")
+
+# Длина текста запроса, сохраняемого в событии
+STATEMENT_LENGTH = 200
+
+
+class Diagnostics:
+    def __init__(self, capacity=1000):
+        self.events = deque(maxlen=capacity)
+        self._listeners = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._profile_next = False
+
+    # --- события ---
+
+    def record(self, kind, name, duration, **fields):
+        """Сохранение события и передача его подписчикам и в журнал"""
+        item = {
+            "ts": datetime.now().isoformat(timespec="milliseconds"),
+            "kind": kind,
+            "name": name,
+            "ms": round(duration * 1000, 3),
+            "thread": threading.current_thread().name,
+            **fields,
+        }
+        self.events.append(item)
+        if logger.handlers:
+            logger.info(json.dumps(item, ensure_ascii=False, default=str))
+        for listener in list(self._listeners):
+            listener(item)
+        return item
+
+    def subscribe(self, listener):
+        """listener(event) вызывается в потоке, где произошло событие"""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    # --- действия ---
+
+    def _actions(self):
+        actions = getattr(self._local, "actions", None)
+        if actions is None:
+            actions = self._local.actions = []
+        return actions
+
+    def profile_next_action(self, enabled=True):
+        """Профилировать cProfile следующее действие верхнего уровня"""
+        self._profile_next = enabled
+
+    @contextmanager
+    def timed(self, name, **fields):
+        """Замер действия вместе с SQL-запросами, выполненными внутри него в этом потоке"""
+        actions = self._actions()
+        profiler = None
+        if not actions and self._profile_next:
+            with self._lock:
+                if self._profile_next:
+                    self._profile_next = False
+                    profiler = cProfile.Profile()
+        stats = {"sql_count": 0, "sql_ms": 0.0, "rows": 0}
+        actions.append(stats)
+        if profiler is not None:
+            profiler.enable()
+        started = time.perf_counter()
+        error = None
+        try:
+            yield fields
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            if profiler is not None:
+                profiler.disable()
+            actions.pop()
+            if error is not None:
+                fields["error"] = error
+            if profiler is not None:
+                fields.update(self._profile_summary(name, profiler))
+            stats["sql_ms"] = round(stats["sql_ms"], 3)
+            self.record("action", name, duration, **{**stats, **fields})
+
+    def _profile_summary(self, name, profiler):
+        path = os.path.join(tempfile.gettempdir(), f"profile_{name}_{datetime.now():%Y%m%d_%H%M%S}.prof")
+        profiler.dump_stats(path)
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(15)
+        return {"profile_file": path, "profile": text.getvalue()}
+
+    # --- SQL ---
+
+    def install(self, engine):
+        """Подключение замеров SQL-запросов к движку"""
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+
+    def _before_execute(self, connection, cursor, statement, parameters, context, executemany):
+        context._diagnostics_started = time.perf_counter()
+
+    def _after_execute(self, connection, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_diagnostics_started", None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        rows = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None
+        for stats in self._actions():
+            stats["sql_count"] += 1
+            stats["sql_ms"] += duration * 1000
+            stats["rows"] += rows or 0
+        self.record("sql", " ".join(statement.split())[:STATEMENT_LENGTH], duration,
+                    rows=rows, executemany=executemany)
+
+
+def enable_log(path):
+    """Журнал событий: одна JSON-строка на событие"""
+    handler = logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+diagnostics = Diagnostics()
+timed = diagnostics.timed
+
+if os.environ.get("PROJECT2_DIAGNOSTICS_LOG"):
+    enable_log(os.environ["PROJECT2_DIAGNOSTICS_LOG"])
@@ -0,0 +1,92 @@
+from collections import defaultdict, deque
+from statistics import median
+
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QCheckBox,
+                             QPlainTextEdit, QTableWidget, QTableWidgetItem, QHeaderView)
+
+from diagnostics import diagnostics
+
+
+class _EventBridge(QObject):
+    """Передача событий диагностики из фоновых потоков в поток интерфейса"""
+
+    recorded = pyqtSignal(object)
+
+
+class DiagnosticsPanel(QWidget):
+    """Панель диагностики: сводка по действиям и последние SQL-запросы"""
+
+    SQL_ROWS = 50
+    # Медиана считается по последним замерам действия
+    LAST_TIMINGS = 200
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._timings = defaultdict(lambda: deque(maxlen=self.LAST_TIMINGS))
+        self._counts = defaultdict(int)
+        self._last = {}
+        self._bridge = _EventBridge(self)
+        self._bridge.recorded.connect(self.add_event)
+        self._listener = self._bridge.recorded.emit
+        diagnostics.subscribe(self._listener)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        controls = QHBoxLayout()
+        self.profileCheck = QCheckBox("cProfile для следующего действия")
+        self.profileCheck.toggled.connect(diagnostics.profile_next_action)
+        clearButton = QPushButton("Очистить")
+        clearButton.clicked.connect(self.clear)
+        controls.addWidget(QLabel("Диагностика"))
+        controls.addStretch()
+        controls.addWidget(self.profileCheck)
+        controls.addWidget(clearButton)
+        layout.addLayout(controls)
+
+        self.actionsTable = QTableWidget(0, 6)
+        self.actionsTable.setHorizontalHeaderLabels(
+            ["Действие", "Раз", "Последнее, мс", "Медиана, мс", "SQL, мс", "Запросов / строк"])
+        self.actionsTable.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.actionsTable.verticalHeader().hide()
+        layout.addWidget(self.actionsTable)
+
+        self.sqlLog = QPlainTextEdit()
+        self.sqlLog.setReadOnly(True)
+        self.sqlLog.setMaximumBlockCount(self.SQL_ROWS)
+        layout.addWidget(self.sqlLog)
+
+        self.setFixedHeight(260)
+
+    def add_event(self, item):
+        if item["kind"] == "sql":
+            rows = "" if item["rows"] is None else f", строк {item['rows']}"
+            self.sqlLog.appendPlainText(f"{item['ms']:8.2f} мс{rows}  {item['name']}")
+            return
+
+        self._timings[item["name"]].append(item["ms"])
+        self._counts[item["name"]] += 1
+        self._last[item["name"]] = item
+        names = sorted(self._last)
+        self.actionsTable.setRowCount(len(names))
+        for row, name in enumerate(names):
+            last = self._last[name]
+            values = [name, str(self._counts[name]), f"{last['ms']:.1f}", f"{median(self._timings[name]):.1f}",
+                      f"{last['sql_ms']:.1f}", f"{last['sql_count']} / {last['rows']}"]
+            for column, value in enumerate(values):
+                self.actionsTable.setItem(row, column, QTableWidgetItem(value))
+        if "profile" in item:
+            self.profileCheck.setChecked(False)
+            self.sqlLog.appendPlainText(f"Профиль {item['name']} сохранен: {item['profile_file']}\n{item['profile']}")
+
+    def clear(self):
+        self._timings.clear()
+        self._counts.clear()
+        self._last.clear()
+        self.actionsTable.setRowCount(0)
+        self.sqlLog.clear()
+
+    def closeEvent(self, event):
+        diagnostics.unsubscribe(self._listener)
+        super().closeEvent(event)
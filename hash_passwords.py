@@ -0,0 +1,67 @@
+"""Массовый перевод паролей, хранящихся открытым текстом, в bcrypt-хеши.
+
+Хеширование выполняется параллельно на всех ядрах (bcrypt - вычислительно
+тяжелая операция), после чего хеши записываются одним пакетным UPDATE.
+Пароль обновляется, только если он не изменился с момента чтения.
+После выполнения вход в приложение больше не тратит время на хеширование.
+
+Запуск:
+    python hash_passwords.py [--rounds 12] [--workers 8]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import select, update, bindparam
+
+from auth import is_hashed, hash_password
+from db import DB_URI, make_engine
+from models import Пользователи
+
+
+def _hash(args):
+    password, rounds = args
+    return hash_password(password, rounds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Хеширование паролей, хранящихся открытым текстом")
+    parser.add_argument("--rounds", type=int, default=12, help="Стоимость bcrypt (log2 числа раундов)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Количество процессов")
+    parser.add_argument("--url", default=DB_URI, help="Строка подключения к БД")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers должно быть не меньше 1")
+
+    engine = make_engine(args.url)
+    with engine.connect() as connection:
+        users = [user for user in connection.execute(select(Пользователи.id, Пользователи.пароль))
+                 if not is_hashed(user.пароль)]
+    if not users:
+        print("Все пароли уже хранятся в виде хешей")
+        return 0
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        hashes = list(pool.map(_hash, ((user.пароль, args.rounds) for user in users),
+                               chunksize=max(1, len(users) // (args.workers * 4))))
+
+    statement = (
+        update(Пользователи)
+        .where(Пользователи.id == bindparam("user_id"), Пользователи.пароль == bindparam("old_password"))
+        .values(пароль=bindparam("new_password"))
+    )
+    with engine.begin() as connection:
+        result = connection.execute(statement, [
+            {"user_id": user.id, "old_password": user.пароль, "new_password": new_hash}
+            for user, new_hash in zip(users, hashes)
+        ])
+    elapsed = time.perf_counter() - started
+    print(f"Захешировано паролей: {result.rowcount} из {len(users)}; время {elapsed:.1f} с")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""Массовый импорт платежей из CSV-файла (например, выгрузки банковской выписки).
+
+Файл читается потоково, каждая строка проверяется по тем же правилам, что
+и в диалоге добавления платежа (validation.py). Корректные строки
+загружаются порциями: в PostgreSQL через COPY, в других СУБД через
+executemany. Весь файл загружается в одной транзакции, отклоненные строки
+с причиной записываются в отдельный файл.
+
+Формат файла - CSV с заголовком и колонками (порядок любой):
+    дата;категория;наименование;количество;цена
+Дата - ДД.ММ.ГГГГ или ГГГГ-ММ-ДД, категория - название или id, цена может
+быть с запятой. Стоимость не указывается: ее вычисляет БД как количество * цена.
+
+Пример:
+    python import_payments.py выписка.csv --user-id 10 --encoding cp1251
+"""
+import argparse
+import csv
+import io
+import sys
+import time
+from datetime import date
+from functools import lru_cache
+from operator import itemgetter
+
+from sqlalchemy import select, insert
+
+from db import DB_URI, make_engine
+from models import Платежи, Категории, Пользователи
+from validation import ValidationError, validate_payment_name, validate_quantity, validate_price
+
+COLUMNS = ("дата", "категория", "наименование", "количество", "цена")
+DB_COLUMNS = ("id_пользователя", "дата", "id_категории", "наименование_платежа", "количество", "цена")
+
+
+@lru_cache(maxsize=4096)
+def parse_date(value):
+    """ДД.ММ.ГГГГ или ГГГГ-ММ-ДД; в выписках даты повторяются, поэтому результат кешируется
+    (strptime на миллионе строк занимает больше времени, чем сама загрузка)"""
+    value = value.strip()
+    try:
+        if len(value) == 10 and value[2] == "." and value[5] == ".":
+            return date(int(value[6:]), int(value[3:5]), int(value[:2]))
+        if len(value) == 10 and value[4] == "-" and value[7] == "-":
+            return date(int(value[:4]), int(value[5:7]), int(value[8:]))
+    except ValueError:
+        pass
+    raise ValidationError(f"Неверная дата: {value!r}")
+
+
+def load_categories(connection):
+    """Поиск категории по названию (без учета регистра) или по id"""
+    categories = {}
+    for category_id, name in connection.execute(select(Категории.id, Категории.название)):
+        categories[name.strip().lower()] = category_id
+        categories[str(category_id)] = category_id
+    return categories
+
+
+def validate_rows(reader, user_id, categories, rejected):
+    """Потоковая проверка строк: выдает кортежи в порядке DB_COLUMNS, ошибки - в rejected"""
+    header = [column.strip().lower() for column in next(reader, [])]
+    missing = [column for column in COLUMNS if column not in header]
+    if missing:
+        raise ValidationError(f"В заголовке нет колонок: {', '.join(missing)}")
+    fields = itemgetter(*(header.index(column) for column in COLUMNS))
+    # Наименования в выписках часто повторяются - проверка каждого выполняется один раз
+    check_name = lru_cache(maxsize=65536)(validate_payment_name)
+
+    for line_number, record in enumerate(reader, start=2):
+        if not any(field.strip() for field in record):
+            continue
+        try:
+            if len(record) < len(header):
+                raise ValidationError("Не хватает колонок")
+            date_value, category_value, name, quantity, price = fields(record)
+            category_id = categories.get(category_value.strip().lower())
+            if category_id is None:
+                raise ValidationError(f"Неизвестная категория: {category_value!r}")
+            payment_date = parse_date(date_value)
+            name = check_name(name)
+            quantity = validate_quantity(quantity)
+            price = validate_price(price)
+        except ValidationError as e:
+            rejected(line_number, record, str(e))
+            continue
+        yield (user_id, payment_date, category_id, name, quantity, price)
+
+
+def _copy_batch(connection, batch):
+    """COPY ... FROM STDIN - самый быстрый способ загрузки в PostgreSQL"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(batch)
+    buffer.seek(0)
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f'COPY "Проект2"."платежи" ({", ".join(DB_COLUMNS)}) FROM STDIN WITH (FORMAT csv)',
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def _insert_batch(connection, batch):
+    """Пакетная вставка через executemany для СУБД без COPY"""
+    connection.execute(insert(Платежи), [dict(zip(DB_COLUMNS, row)) for row in batch])
+
+
+def import_payments(engine, stream, user_id, batch_size=10000, rejected=None, delimiter=";"):
+    """Импорт платежей из текстового потока; возвращает (загружено, отклонено)"""
+    counts = {"rejected": 0}
+
+    def reject(line_number, record, reason):
+        counts["rejected"] += 1
+        if rejected is not None:
+            rejected(line_number, record, reason)
+
+    loaded = 0
+    with engine.begin() as connection:
+        if connection.execute(select(Пользователи.id).where(Пользователи.id == user_id)).first() is None:
+            raise ValidationError(f"Пользователь с id {user_id} не найден")
+        load_batch = _copy_batch if connection.dialect.name == "postgresql" else _insert_batch
+        categories = load_categories(connection)
+
+        batch = []
+        for row in validate_rows(csv.reader(stream, delimiter=delimiter), user_id, categories, reject):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                load_batch(connection, batch)
+                loaded += len(batch)
+                batch = []
+        if batch:
+            load_batch(connection, batch)
+            loaded += len(batch)
+    return loaded, counts["rejected"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Импорт платежей из CSV-файла")
+    parser.add_argument("file", help="CSV-файл с платежами")
+    parser.add_argument("--user-id", type=int, required=True, help="id пользователя, которому принадлежат платежи")
+    parser.add_argument("--encoding", default="utf-8", help="Кодировка файла (для выписок часто cp1251)")
+    parser.add_argument("--delimiter", default=";", help="Разделитель колонок")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Строк в одной порции загрузки")
+    parser.add_argument("--rejects", help="Файл для отклоненных строк (по умолчанию <файл>.rejects.csv)")
+    parser.add_argument("--url", default=DB_URI, help="Строка подключения к БД")
+    args = parser.parse_args(argv)
+
+    rejects_path = args.rejects or args.file + ".rejects.csv"
+    started = time.perf_counter()
+    with open(args.file, newline="", encoding=args.encoding) as source, \
+            open(rejects_path, "w", newline="", encoding="utf-8") as rejects_file:
+        rejects_writer = csv.writer(rejects_file, delimiter=args.delimiter)
+        rejects_writer.writerow(["строка", "причина", "исходные поля"])
+
+        def rejected(line_number, record, reason):
+            rejects_writer.writerow([line_number, reason, *record])
+
+        try:
+            loaded, rejected_count = import_payments(
+                make_engine(args.url, statement_timeout=0), source, args.user_id, args.batch_size, rejected, args.delimiter)
+        except ValidationError as e:
+            print(f"Ошибка: {e}")
+            return 1
+
+    elapsed = time.perf_counter() - started
+    print(f"Загружено платежей: {loaded}, отклонено строк: {rejected_count}; время {elapsed:.1f} с")
+    if rejected_count:
+        print(f"Отклоненные строки с причинами: {rejects_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
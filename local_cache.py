@@ -0,0 +1,227 @@
+"""Локальная копия платежей пользователя в файле SQLite.
+
+Пользователь видит только свои платежи, поэтому после входа они копируются
+в локальный файл, и выборки по периоду и категории выполняются без обращения
+к серверу - приложение остается отзывчивым, даже когда сервер медленный или
+недоступен. Изменения забираются с сервера порциями по отметке изменения
+(db.payment_changes): добавленные и измененные строки заменяют локальные,
+удаленные на другом компьютере (журнал Проект2.удаленные_платежи) удаляются.
+Если после синхронизации число платежей не совпало с сервером (например,
+строки удалены до появления журнала), копия загружается заново.
+
+Сервер остается главным: добавление и удаление выполняются на сервере и
+сразу же повторяются в локальной копии.
+
+Копия включается переменной окружения PROJECT2_LOCAL_CACHE - каталогом для
+файлов (по одному на пользователя). Файлы содержат платежи пользователя в
+открытом виде и должны лежать в каталоге, доступном только ему.
+"""
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import Column, MetaData, String, Table, create_engine, delete, event, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+import db
+from models import Платежи
+from queries import PaymentRow, payment_conditions
+from reference_data import categories
+
+CACHE_DIR = os.environ.get("PROJECT2_LOCAL_CACHE")
+
+# Период фоновой синхронизации, секунд
+SYNC_INTERVAL = 60
+
+# Итог синхронизации: копия загружена заново или сколько строк копии действительно
+# изменено и удалено (строки, уже повторенные в копии окном, не считаются)
+SyncResult = namedtuple("SyncResult", "full changed deleted")
+
+# id в одном запросе сверки с копией (ограничение SQLite на число параметров)
+_ID_CHUNK = 10000
+
+# Версия структуры файла копии (PRAGMA user_version); файл другой версии создается заново
+CACHE_VERSION = 2
+
+# Колонки, которые записываются в копию; вычисляемую стоимость SQLite считает сама
+_WRITABLE_COLUMNS = frozenset(column.name for column in Платежи.__table__.columns if column.computed is None)
+
+_metadata = MetaData()
+
+# Состояние копии: сервер, пользователь, отметка последней синхронизации
+_sync_state = Table(
+    "синхронизация", _metadata,
+    Column("ключ", String(50), primary_key=True),
+    Column("значение", String(500), nullable=False),
+    schema="Проект2"
+)
+
+
+def _make_engine(path):
+    """Файл копии подключается как схема Проект2 - запросы queries.py работают без изменений"""
+    engine = create_engine("sqlite://", poolclass=QueuePool, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def attach(dbapi_connection, _):
+        # Путь передается параметром: каталог копии может содержать кавычки
+        dbapi_connection.execute('ATTACH DATABASE ? AS "Проект2"', (path,))
+        # Чтение списка не ждет записи синхронизации
+        dbapi_connection.execute('PRAGMA "Проект2".journal_mode=WAL')
+        dbapi_connection.execute('PRAGMA "Проект2".synchronous=NORMAL')
+        db.register_sqlite_functions(dbapi_connection)
+
+    return engine
+
+
+class LocalPaymentCache:
+    """Копия платежей одного пользователя"""
+
+    def __init__(self, user_id, directory=CACHE_DIR, server_url=None):
+        os.makedirs(directory, exist_ok=True)
+        self.user_id = user_id
+        self.path = os.path.join(directory, f"payments_{user_id}.sqlite")
+        # Копия, снятая с другой БД, при синхронизации загружается заново
+        self.server = (server_url or db.get_engine().url).render_as_string(hide_password=True)
+        self.engine = _make_engine(self.path)
+        self.Session = sessionmaker(bind=self.engine)
+        # Синхронизации одной копии выполняются по очереди
+        self._sync_lock = threading.Lock()
+        self._create_schema()
+        with self.Session() as session:
+            self.synced_at = self._state(session).get("время") if self._marker(session) is not None else None
+
+    def _create_schema(self):
+        with self.engine.begin() as connection:
+            if connection.exec_driver_sql('PRAGMA "Проект2".user_version').scalar() != CACHE_VERSION:
+                # Копия старой структуры просто загружается с сервера заново
+                Платежи.__table__.drop(connection, checkfirst=True)
+                _sync_state.drop(connection, checkfirst=True)
+                connection.exec_driver_sql(f'PRAGMA "Проект2".user_version = {CACHE_VERSION}')
+            Платежи.__table__.create(connection, checkfirst=True)
+            _sync_state.create(connection, checkfirst=True)
+
+    @property
+    def ready(self):
+        """Копия хотя бы раз синхронизирована с текущим сервером"""
+        return self.synced_at is not None
+
+    def _state(self, session):
+        return dict(session.execute(select(_sync_state.c.ключ, _sync_state.c.значение)).all())
+
+    def _save_state(self, session, **values):
+        statement = insert(_sync_state)
+        session.execute(statement.on_conflict_do_update(
+            index_elements=[_sync_state.c.ключ], set_={"значение": statement.excluded.значение}
+        ), [{"ключ": key, "значение": value} for key, value in values.items()])
+
+    def _marker(self, session):
+        """Отметка последней синхронизации или None, если копию нужно загрузить заново"""
+        state = self._state(session)
+        if state.get("сервер") != self.server or state.get("пользователь") != str(self.user_id):
+            return None
+        return int(state["отметка"]) if "отметка" in state else None
+
+    def _count(self, session):
+        return session.execute(
+            select(func.count()).select_from(Платежи).where(Платежи.id_пользователя == self.user_id)
+        ).scalar_one()
+
+    def _changed_rows(self, session, rows):
+        """Сколько строк с сервера отличаются от копии значениями, видимыми в списке.
+
+        Добавление и удаление в окне сразу повторяются в копии (apply_added,
+        apply_deleted), и следующая синхронизация приносит эти же строки еще
+        раз - перечитывать из-за них список не нужно.
+        """
+        columns = [getattr(Платежи, name) for name in PaymentRow._fields]
+        ids = [row.id for row in rows]
+        local = {}
+        for start in range(0, len(ids), _ID_CHUNK):
+            local.update((row.id, tuple(row)) for row in session.execute(
+                select(*columns).where(Платежи.id.in_(ids[start:start + _ID_CHUNK]))))
+        return sum(1 for row in rows if local.get(row.id) != tuple(getattr(row, name) for name in PaymentRow._fields))
+
+    def _apply(self, session, changes, full):
+        """Запись изменений с сервера; при full копия заменяется целиком.
+
+        Возвращает число действительно измененных и удаленных строк копии.
+        """
+        if full:
+            session.execute(delete(Платежи))
+        changed = deleted = 0
+        if changes.rows:
+            changed = len(changes.rows) if full else self._changed_rows(session, changes.rows)
+            statement = insert(Платежи)
+            columns = [name for name in changes.rows[0]._fields if name in _WRITABLE_COLUMNS]
+            session.execute(statement.on_conflict_do_update(
+                index_elements=[Платежи.id],
+                set_={name: statement.excluded[name] for name in columns if name != "id"}
+            ), [self._values(row, columns) for row in changes.rows])
+        if changes.deleted_ids:
+            deleted = session.execute(delete(Платежи).where(Платежи.id.in_(changes.deleted_ids))).rowcount
+        return changed, deleted
+
+    def sync(self, server_session):
+        """Перенос изменений с сервера (выполняется в фоновом потоке)"""
+        with self._sync_lock, self.Session() as session:
+            since = self._marker(session)
+            full = since is None
+            changes = db.payment_changes(server_session, self.user_id, since)
+            changed, deleted = self._apply(session, changes, full)
+            # Строки, удаленные мимо журнала, обнаруживаются по расхождению количества
+            if not full and self._count(session) != db.payment_count(server_session, self.user_id):
+                full = True
+                changes = db.payment_changes(server_session, self.user_id)
+                changed, deleted = self._apply(session, changes, full)
+            synced_at = datetime.now().strftime("%d.%m.%Y %H:%M")
+            self._save_state(session, сервер=self.server, пользователь=str(self.user_id),
+                             отметка=str(changes.marker), время=synced_at)
+            session.commit()
+        self.synced_at = synced_at
+        return SyncResult(full, changed, deleted)
+
+    def _values(self, row, columns):
+        return {**{name: getattr(row, name) for name in columns}, "id_пользователя": self.user_id}
+
+    def apply_added(self, payment):
+        """Повтор в копии платежа, уже добавленного на сервере (PaymentRow)"""
+        columns = [name for name in payment._fields if name in _WRITABLE_COLUMNS]
+        with self.Session.begin() as session:
+            session.execute(insert(Платежи).on_conflict_do_nothing(index_elements=[Платежи.id]),
+                            self._values(payment, columns))
+
+    def apply_deleted(self, payment_ids):
+        """Повтор в копии удаления, уже выполненного на сервере"""
+        with self.Session.begin() as session:
+            session.execute(delete(Платежи).where(Платежи.id.in_(list(payment_ids))))
+
+    def close(self):
+        self.engine.dispose()
+
+
+def open_cache(user_id):
+    """Копия платежей пользователя или None, если локальная копия не включена"""
+    if not CACHE_DIR:
+        return None
+    return LocalPaymentCache(user_id)
+
+
+def category_totals(session, payment_filter):
+    """Итоги по категориям по локальной копии - в том же виде, что rollup.category_totals.
+
+    Свертки в копии нет: платежей одного пользователя немного, и они
+    суммируются напрямую по индексу (пользователь, дата).
+    """
+    totals = {
+        row.id_категории: (row.количество, row.сумма)
+        for row in session.execute(select(
+            Платежи.id_категории,
+            func.count().label("количество"),
+            func.sum(Платежи.стоимость).label("сумма")
+        ).where(*payment_conditions(payment_filter)).group_by(Платежи.id_категории))
+    }
+    ordered = sorted(totals, key=lambda category_id: (categories.name(category_id), category_id))
+    return {category_id: (categories.name(category_id), *totals[category_id]) for category_id in ordered}
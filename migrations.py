@@ -0,0 +1,533 @@
+"""Версионные миграции схемы Проект2.
+
+Base.metadata.create_all создает только отсутствующие таблицы, поэтому
+изменения существующих таблиц (индексы и т.п.) оформляются миграциями.
+Примененные версии записываются в таблицу Проект2.версия_схемы.
+
+Запуск:
+    python migrations.py status
+    python migrations.py upgrade
+    python migrations.py search-index   # индекс поиска, если при миграции 5 не было расширений
+"""
+import argparse
+import logging
+import sys
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from db import DB_URI, make_engine
+
+VERSION_TABLE = '"Проект2"."версия_схемы"'
+
+SEARCH_INDEX = "ix_платежи_польз_наименование_trgm"
+
+logger = logging.getLogger("project2.migrations")
+
+
+def _create_index(connection, name, columns, include=()):
+    """CREATE INDEX IF NOT EXISTS; INCLUDE-колонки поддерживает только PostgreSQL"""
+    if connection.dialect.name == "sqlite":
+        # В SQLite схема указывается у имени индекса, а не у таблицы
+        ddl = f'CREATE INDEX IF NOT EXISTS "Проект2"."{name}" ON "платежи" ({", ".join(columns)})'
+    else:
+        ddl = f'CREATE INDEX IF NOT EXISTS "{name}" ON "Проект2"."платежи" ({", ".join(columns)})'
+    if include and connection.dialect.name == "postgresql":
+        ddl += f' INCLUDE ({", ".join(include)})'
+    connection.execute(text(ddl))
+
+
+def _drop_index(connection, name):
+    connection.execute(text(f'DROP INDEX IF EXISTS "Проект2"."{name}"'))
+
+
+def _create_payment_indexes(connection):
+    """Составные индексы под выборку платежей пользователя за период"""
+    _create_index(connection, "ix_платежи_польз_дата", ["id_пользователя", "дата"],
+                  ["id_категории", "наименование_платежа", "количество", "цена", "стоимость"])
+    _create_index(connection, "ix_платежи_польз_кат_дата", ["id_пользователя", "id_категории", "дата"],
+                  ["наименование_платежа", "количество", "цена", "стоимость"])
+
+
+def _add_id_to_payment_indexes(connection):
+    """id платежа в ключе индексов: список теперь выбирает id, а (дата, id) задает однозначный порядок"""
+    _drop_index(connection, "ix_платежи_польз_дата")
+    _drop_index(connection, "ix_платежи_польз_кат_дата")
+    _create_index(connection, "ix_платежи_польз_дата", ["id_пользователя", "дата", "id"],
+                  ["id_категории", "наименование_платежа", "количество", "цена", "стоимость"])
+    _create_index(connection, "ix_платежи_польз_кат_дата", ["id_пользователя", "id_категории", "дата", "id"],
+                  ["наименование_платежа", "количество", "цена", "стоимость"])
+
+
+_ROLLUP_INSERT_SQL = """
+    INSERT INTO "Проект2"."платежи_по_месяцам" (id_пользователя, месяц, id_категории, количество, сумма)
+    SELECT id_пользователя, {month}, id_категории, count(*), sum(стоимость)
+    FROM "Проект2"."платежи"
+    WHERE id_пользователя IS NOT NULL AND id_категории IS NOT NULL
+    GROUP BY 1, 2, 3
+"""
+
+_POSTGRES_ROLLUP_TRIGGERS = """
+CREATE OR REPLACE FUNCTION "Проект2"."свертка_платежей_добавить"() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO "Проект2"."платежи_по_месяцам" AS r (id_пользователя, месяц, id_категории, количество, сумма)
+    SELECT id_пользователя, date_trunc('month', дата)::date, id_категории, count(*), sum(стоимость)
+    FROM новые
+    WHERE id_пользователя IS NOT NULL AND id_категории IS NOT NULL
+    GROUP BY 1, 2, 3
+    ON CONFLICT (id_пользователя, месяц, id_категории) DO UPDATE
+        SET количество = r.количество + EXCLUDED.количество,
+            сумма = r.сумма + EXCLUDED.сумма;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION "Проект2"."свертка_платежей_вычесть"() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE "Проект2"."платежи_по_месяцам" AS r
+    SET количество = r.количество - d.количество,
+        сумма = r.сумма - d.сумма
+    FROM (
+        SELECT id_пользователя, date_trunc('month', дата)::date AS месяц, id_категории,
+               count(*) AS количество, sum(стоимость) AS сумма
+        FROM старые
+        GROUP BY 1, 2, 3
+    ) AS d
+    WHERE r.id_пользователя = d.id_пользователя AND r.месяц = d.месяц AND r.id_категории = d.id_категории;
+
+    DELETE FROM "Проект2"."платежи_по_месяцам" WHERE количество <= 0;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION "Проект2"."свертка_платежей_изменить"() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    -- Изменение = вычитание старых значений и добавление новых
+    UPDATE "Проект2"."платежи_по_месяцам" AS r
+    SET количество = r.количество - d.количество,
+        сумма = r.сумма - d.сумма
+    FROM (
+        SELECT id_пользователя, date_trunc('month', дата)::date AS месяц, id_категории,
+               count(*) AS количество, sum(стоимость) AS сумма
+        FROM старые
+        GROUP BY 1, 2, 3
+    ) AS d
+    WHERE r.id_пользователя = d.id_пользователя AND r.месяц = d.месяц AND r.id_категории = d.id_категории;
+
+    INSERT INTO "Проект2"."платежи_по_месяцам" AS r (id_пользователя, месяц, id_категории, количество, сумма)
+    SELECT id_пользователя, date_trunc('month', дата)::date, id_категории, count(*), sum(стоимость)
+    FROM новые
+    WHERE id_пользователя IS NOT NULL AND id_категории IS NOT NULL
+    GROUP BY 1, 2, 3
+    ON CONFLICT (id_пользователя, месяц, id_категории) DO UPDATE
+        SET количество = r.количество + EXCLUDED.количество,
+            сумма = r.сумма + EXCLUDED.сумма;
+
+    DELETE FROM "Проект2"."платежи_по_месяцам" WHERE количество <= 0;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS "свертка_добавить" ON "Проект2"."платежи";
+DROP TRIGGER IF EXISTS "свертка_вычесть" ON "Проект2"."платежи";
+DROP TRIGGER IF EXISTS "свертка_изменить" ON "Проект2"."платежи";
+
+CREATE TRIGGER "свертка_добавить" AFTER INSERT ON "Проект2"."платежи"
+    REFERENCING NEW TABLE AS новые
+    FOR EACH STATEMENT EXECUTE FUNCTION "Проект2"."свертка_платежей_добавить"();
+CREATE TRIGGER "свертка_вычесть" AFTER DELETE ON "Проект2"."платежи"
+    REFERENCING OLD TABLE AS старые
+    FOR EACH STATEMENT EXECUTE FUNCTION "Проект2"."свертка_платежей_вычесть"();
+CREATE TRIGGER "свертка_изменить" AFTER UPDATE ON "Проект2"."платежи"
+    REFERENCING OLD TABLE AS старые NEW TABLE AS новые
+    FOR EACH STATEMENT EXECUTE FUNCTION "Проект2"."свертка_платежей_изменить"();
+"""
+
+# В SQLite нет триггеров уровня оператора - свертка обновляется построчно
+_SQLITE_ROLLUP_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS "Проект2"."свертка_добавить" AFTER INSERT ON "платежи"
+    WHEN NEW.id_пользователя IS NOT NULL AND NEW.id_категории IS NOT NULL
+    BEGIN
+        INSERT INTO "платежи_по_месяцам" (id_пользователя, месяц, id_категории, количество, сумма)
+        VALUES (NEW.id_пользователя, date(NEW.дата, 'start of month'), NEW.id_категории, 1, NEW.стоимость)
+        ON CONFLICT (id_пользователя, месяц, id_категории) DO UPDATE
+            SET количество = количество + 1, сумма = сумма + excluded.сумма;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS "Проект2"."свертка_вычесть" AFTER DELETE ON "платежи"
+    BEGIN
+        UPDATE "платежи_по_месяцам"
+        SET количество = количество - 1, сумма = сумма - OLD.стоимость
+        WHERE id_пользователя = OLD.id_пользователя
+          AND месяц = date(OLD.дата, 'start of month')
+          AND id_категории = OLD.id_категории;
+        DELETE FROM "платежи_по_месяцам" WHERE количество <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS "Проект2"."свертка_изменить" AFTER UPDATE ON "платежи"
+    BEGIN
+        UPDATE "платежи_по_месяцам"
+        SET количество = количество - 1, сумма = сумма - OLD.стоимость
+        WHERE id_пользователя = OLD.id_пользователя
+          AND месяц = date(OLD.дата, 'start of month')
+          AND id_категории = OLD.id_категории;
+        INSERT INTO "платежи_по_месяцам" (id_пользователя, месяц, id_категории, количество, сумма)
+        SELECT NEW.id_пользователя, date(NEW.дата, 'start of month'), NEW.id_категории, 1, NEW.стоимость
+        WHERE NEW.id_пользователя IS NOT NULL AND NEW.id_категории IS NOT NULL
+        ON CONFLICT (id_пользователя, месяц, id_категории) DO UPDATE
+            SET количество = количество + 1, сумма = сумма + excluded.сумма;
+        DELETE FROM "платежи_по_месяцам" WHERE количество <= 0;
+    END
+    """,
+]
+
+
+def _create_monthly_rollup(connection):
+    """Свертка платежей по месяцам и категориям, триггеры ее поддержки и начальное заполнение"""
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS "Проект2"."платежи_по_месяцам" (
+            id_пользователя INTEGER NOT NULL REFERENCES "Проект2"."пользователи" (id),
+            месяц DATE NOT NULL,
+            id_категории INTEGER NOT NULL REFERENCES "Проект2"."категории" (id),
+            количество INTEGER NOT NULL,
+            сумма FLOAT NOT NULL,
+            PRIMARY KEY (id_пользователя, месяц, id_категории)
+        )
+    """ if connection.dialect.name != "sqlite" else """
+        CREATE TABLE IF NOT EXISTS "Проект2"."платежи_по_месяцам" (
+            id_пользователя INTEGER NOT NULL,
+            месяц DATE NOT NULL,
+            id_категории INTEGER NOT NULL,
+            количество INTEGER NOT NULL,
+            сумма FLOAT NOT NULL,
+            PRIMARY KEY (id_пользователя, месяц, id_категории)
+        )
+    """))
+    if connection.dialect.name == "postgresql":
+        # Изменения платежей блокируются, пока создаются триггеры и заполняется свертка
+        connection.execute(text('LOCK TABLE "Проект2"."платежи" IN SHARE ROW EXCLUSIVE MODE'))
+        connection.execute(text(_POSTGRES_ROLLUP_TRIGGERS))
+        month = "date_trunc('month', дата)::date"
+    else:
+        for ddl in _SQLITE_ROLLUP_TRIGGERS:
+            connection.execute(text(ddl))
+        month = "date(дата, 'start of month')"
+    connection.execute(text('DELETE FROM "Проект2"."платежи_по_месяцам"'))
+    connection.execute(text(_ROLLUP_INSERT_SQL.format(month=month)))
+
+
+# Отметка изменения в PostgreSQL - номер транзакции, изменившей строку. Синхронизация
+# берет отметку как xmin своего снимка: все транзакции с меньшими номерами уже
+# завершены, поэтому изменение, зафиксированное позже, не может получить номер
+# меньше выданной клиенту отметки и не будет пропущено (db.change_marker)
+_POSTGRES_VERSION_TRIGGERS = """
+ALTER TABLE "Проект2"."платежи" ADD COLUMN IF NOT EXISTS версия BIGINT NOT NULL DEFAULT 0;
+-- Существующие строки остаются с отметкой 0, новые получают номер своей транзакции
+ALTER TABLE "Проект2"."платежи" ALTER COLUMN версия SET DEFAULT pg_current_xact_id()::text::bigint;
+
+CREATE TABLE IF NOT EXISTS "Проект2"."удаленные_платежи" (
+    id INTEGER PRIMARY KEY,
+    id_пользователя INTEGER NOT NULL,
+    версия BIGINT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS "ix_удаленные_платежи_польз_версия"
+    ON "Проект2"."удаленные_платежи" (id_пользователя, версия);
+
+CREATE OR REPLACE FUNCTION "Проект2"."версия_платежа_изменить"() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.версия := pg_current_xact_id()::text::bigint;
+    IF OLD.id_пользователя IS NOT NULL AND NEW.id_пользователя IS DISTINCT FROM OLD.id_пользователя THEN
+        -- Для прежнего владельца перенос платежа выглядит как удаление
+        INSERT INTO "Проект2"."удаленные_платежи" (id, id_пользователя, версия)
+        VALUES (OLD.id, OLD.id_пользователя, NEW.версия)
+        ON CONFLICT (id) DO UPDATE SET id_пользователя = EXCLUDED.id_пользователя, версия = EXCLUDED.версия;
+    END IF;
+    RETURN NEW;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION "Проект2"."удаление_платежей_записать"() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO "Проект2"."удаленные_платежи" AS d (id, id_пользователя, версия)
+    SELECT id, id_пользователя, pg_current_xact_id()::text::bigint
+    FROM старые
+    WHERE id_пользователя IS NOT NULL
+    ON CONFLICT (id) DO UPDATE SET id_пользователя = EXCLUDED.id_пользователя, версия = EXCLUDED.версия;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS "версия_изменить" ON "Проект2"."платежи";
+DROP TRIGGER IF EXISTS "удаление_записать" ON "Проект2"."платежи";
+
+CREATE TRIGGER "версия_изменить" BEFORE UPDATE ON "Проект2"."платежи"
+    FOR EACH ROW EXECUTE FUNCTION "Проект2"."версия_платежа_изменить"();
+CREATE TRIGGER "удаление_записать" AFTER DELETE ON "Проект2"."платежи"
+    REFERENCING OLD TABLE AS старые
+    FOR EACH STATEMENT EXECUTE FUNCTION "Проект2"."удаление_платежей_записать"();
+"""
+
+# В SQLite запись в БД выполняется по одной транзакции за раз, поэтому
+# отметкой служит счетчик изменений
+_SQLITE_VERSION_TRIGGERS = [
+    """
+    CREATE TABLE IF NOT EXISTS "Проект2"."удаленные_платежи" (
+        id INTEGER PRIMARY KEY,
+        id_пользователя INTEGER NOT NULL,
+        версия BIGINT NOT NULL
+    )
+    """,
+    'CREATE INDEX IF NOT EXISTS "Проект2"."ix_удаленные_платежи_польз_версия" ON "удаленные_платежи" (id_пользователя, версия)',
+    'CREATE TABLE IF NOT EXISTS "Проект2"."счетчик_версий" (значение BIGINT NOT NULL)',
+    'INSERT INTO "Проект2"."счетчик_версий" (значение) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM "Проект2"."счетчик_версий")',
+    """
+    CREATE TRIGGER IF NOT EXISTS "Проект2"."версия_добавить" AFTER INSERT ON "платежи"
+    BEGIN
+        UPDATE "счетчик_версий" SET значение = значение + 1;
+        UPDATE "платежи" SET версия = (SELECT значение FROM "счетчик_версий") WHERE id = NEW.id;
+    END
+    """,
+    # Список колонок не включает версию: ее обновление триггерами не считается изменением платежа
+    """
+    CREATE TRIGGER IF NOT EXISTS "Проект2"."версия_изменить"
+    AFTER UPDATE OF id_пользователя, дата, id_категории, наименование_платежа, количество, цена, стоимость
+    ON "платежи"
+    BEGIN
+        UPDATE "счетчик_версий" SET значение = значение + 1;
+        UPDATE "платежи" SET версия = (SELECT значение FROM "счетчик_версий") WHERE id = NEW.id;
+        INSERT OR REPLACE INTO "удаленные_платежи" (id, id_пользователя, версия)
+        SELECT OLD.id, OLD.id_пользователя, значение FROM "счетчик_версий"
+        WHERE OLD.id_пользователя IS NOT NULL AND OLD.id_пользователя IS NOT NEW.id_пользователя;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS "Проект2"."удаление_записать" AFTER DELETE ON "платежи"
+    WHEN OLD.id_пользователя IS NOT NULL
+    BEGIN
+        UPDATE "счетчик_версий" SET значение = значение + 1;
+        INSERT OR REPLACE INTO "удаленные_платежи" (id, id_пользователя, версия)
+        SELECT OLD.id, OLD.id_пользователя, значение FROM "счетчик_версий";
+    END
+    """,
+]
+
+
+def _add_change_tracking(connection):
+    """Отметка изменения платежа и журнал удалений для синхронизации локальных копий"""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(_POSTGRES_VERSION_TRIGGERS))
+        _create_index(connection, "ix_платежи_польз_версия", ["id_пользователя", "версия"])
+        return
+    columns = [row[1] for row in connection.execute(text('PRAGMA "Проект2".table_info("платежи")'))]
+    if "версия" not in columns:
+        connection.execute(text('ALTER TABLE "Проект2"."платежи" ADD COLUMN версия BIGINT NOT NULL DEFAULT 0'))
+    for ddl in _SQLITE_VERSION_TRIGGERS:
+        connection.execute(text(ddl))
+    _create_index(connection, "ix_платежи_польз_версия", ["id_пользователя", "версия"])
+    # Свертка пересчитывается только при изменении учитываемых в ней колонок,
+    # а не при каждой простановке версии триггером
+    connection.execute(text('DROP TRIGGER IF EXISTS "Проект2"."свертка_изменить"'))
+    connection.execute(text(_SQLITE_ROLLUP_TRIGGERS[2].replace(
+        'AFTER UPDATE ON "платежи"', 'AFTER UPDATE OF id_пользователя, дата, id_категории, стоимость ON "платежи"')))
+
+
+
+def _create_search_index(connection):
+    """Триграммный индекс для поиска по подстроке наименования (queries.search_condition).
+
+    pg_trgm разбивает текст на триграммы с учетом букв любого алфавита, поэтому
+    ILIKE '%...%' по русским наименованиям идет по индексу, а не перебором таблицы.
+    btree_gin позволяет включить в тот же индекс пользователя: поиск не
+    перебирает совпадения других пользователей.
+
+    Индекс не обязателен: ILIKE работает и без него. Если расширения не
+    установлены на сервере или их нельзя создать, миграция только
+    предупреждает, а индекс можно создать позже (python migrations.py search-index).
+    Возвращает True, если индекс есть.
+    """
+    if connection.dialect.name != "postgresql":
+        # В SQLite такого индекса нет; поиск перебирает платежи пользователя по его индексу
+        return False
+    available = set(connection.execute(text(
+        "SELECT name FROM pg_available_extensions WHERE name IN ('pg_trgm', 'btree_gin')"
+    )).scalars())
+    missing = {"pg_trgm", "btree_gin"} - available
+    if missing:
+        logger.warning("Индекс поиска не создан: нет расширений PostgreSQL %s (пакет postgresql-contrib)",
+                       ", ".join(sorted(missing)))
+        return False
+    try:
+        # Точка сохранения: при нехватке прав откатывается только создание расширений
+        with connection.begin_nested():
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gin"))
+    except DBAPIError as e:
+        logger.warning("Индекс поиска не создан: не удалось создать расширения pg_trgm, btree_gin: %s",
+                       str(e.orig).strip())
+        return False
+    # Расширение могло быть установлено раньше в другую схему
+    schema = connection.execute(text(
+        "SELECT n.nspname FROM pg_extension e JOIN pg_namespace n ON n.oid = e.extnamespace WHERE e.extname = 'pg_trgm'"
+    )).scalar_one()
+    connection.execute(text(
+        f'CREATE INDEX IF NOT EXISTS "{SEARCH_INDEX}" ON "Проект2"."платежи" '
+        f'USING gin (id_пользователя, наименование_платежа "{schema}".gin_trgm_ops)'
+    ))
+    return True
+
+
+def search_index_exists(connection):
+    """Есть ли триграммный индекс поиска (только PostgreSQL)"""
+    return connection.execute(text(
+        "SELECT to_regclass(:name) IS NOT NULL"), {"name": f'"Проект2"."{SEARCH_INDEX}"'}).scalar_one()
+
+
+def _is_generated(connection, table, column):
+    if connection.dialect.name == "postgresql":
+        return connection.execute(text(
+            "SELECT is_generated = 'ALWAYS' FROM information_schema.columns "
+            "WHERE table_schema = 'Проект2' AND table_name = :table AND column_name = :column"
+        ), {"table": table, "column": column}).scalar_one()
+    # hidden: 2 - вычисляемая VIRTUAL, 3 - STORED
+    return any(row[1] == column and row[6] in (2, 3)
+               for row in connection.execute(text(f'PRAGMA "Проект2".table_xinfo("{table}")')))
+
+
+_POSTGRES_EXACT_MONEY = """
+ALTER TABLE "Проект2"."платежи"
+    ALTER COLUMN цена TYPE NUMERIC(12, 2) USING round(цена::numeric, 2),
+    -- Вместе с колонкой удаляются покрывающие индексы с ней в INCLUDE
+    DROP COLUMN стоимость,
+    ADD COLUMN стоимость NUMERIC(14, 2) GENERATED ALWAYS AS (количество * цена) STORED NOT NULL;
+ALTER TABLE "Проект2"."платежи_по_месяцам" ALTER COLUMN сумма TYPE NUMERIC(16, 2) USING round(сумма::numeric, 2);
+"""
+
+
+def _exact_money(connection):
+    """Цена и суммы в NUMERIC, стоимость - вычисляемая БД колонка количество * цена.
+
+    Суммы во float накапливали ошибку округления, а стоимость считал и
+    записывал клиент. Существующие цены округляются до копеек, стоимость
+    пересчитывается, свертка перестраивается по точным суммам.
+    """
+    if connection.dialect.name == "postgresql":
+        if not _is_generated(connection, "платежи", "стоимость"):
+            connection.execute(text(_POSTGRES_EXACT_MONEY))
+            _create_index(connection, "ix_платежи_польз_дата", ["id_пользователя", "дата", "id"],
+                          ["id_категории", "наименование_платежа", "количество", "цена", "стоимость"])
+            _create_index(connection, "ix_платежи_польз_кат_дата", ["id_пользователя", "id_категории", "дата", "id"],
+                          ["наименование_платежа", "количество", "цена", "стоимость"])
+        connection.execute(text('LOCK TABLE "Проект2"."платежи" IN SHARE ROW EXCLUSIVE MODE'))
+        month = "date_trunc('month', дата)::date"
+    else:
+        # SQLite не удаляет колонку, на которую ссылаются триггеры, и не меняет тип колонки:
+        # триггеры пересоздаются, стоимость добавляется как VIRTUAL (STORED через ALTER нельзя)
+        for name in ("свертка_добавить", "свертка_вычесть", "свертка_изменить", "версия_изменить"):
+            connection.execute(text(f'DROP TRIGGER IF EXISTS "Проект2"."{name}"'))
+        # Цены округляются до копеек, как USING round(...) в PostgreSQL (триггеры уже сняты)
+        connection.execute(text('UPDATE "Проект2"."платежи" SET цена = round(цена, 2) WHERE цена <> round(цена, 2)'))
+        if not _is_generated(connection, "платежи", "стоимость"):
+            connection.execute(text('ALTER TABLE "Проект2"."платежи" DROP COLUMN стоимость'))
+            connection.execute(text(
+                'ALTER TABLE "Проект2"."платежи" ADD COLUMN стоимость NUMERIC(14, 2) '
+                'GENERATED ALWAYS AS (количество * цена) VIRTUAL NOT NULL'
+            ))
+        connection.execute(text(_SQLITE_ROLLUP_TRIGGERS[0]))
+        connection.execute(text(_SQLITE_ROLLUP_TRIGGERS[1]))
+        # Стоимость меняется только вместе с количеством или ценой
+        connection.execute(text(_SQLITE_ROLLUP_TRIGGERS[2].replace(
+            'AFTER UPDATE ON "платежи"',
+            'AFTER UPDATE OF id_пользователя, дата, id_категории, количество, цена ON "платежи"')))
+        connection.execute(text(_SQLITE_VERSION_TRIGGERS[5].replace("количество, цена, стоимость", "количество, цена")))
+        month = "date(дата, 'start of month')"
+    connection.execute(text('DELETE FROM "Проект2"."платежи_по_месяцам"'))
+    connection.execute(text(_ROLLUP_INSERT_SQL.format(month=month)))
+
+
+# (версия, описание, функция применения) - только добавлять в конец, примененные не менять
+MIGRATIONS = [
+    (1, "Составные индексы платежей по пользователю, категории и дате", _create_payment_indexes),
+    (2, "id платежа в ключе индексов выборки платежей", _add_id_to_payment_indexes),
+    (3, "Помесячная свертка платежей по категориям с триггерами", _create_monthly_rollup),
+    (4, "Отметка изменения платежей и журнал удаленных платежей", _add_change_tracking),
+    (5, "Триграммный индекс поиска по наименованию платежа", _create_search_index),
+    (6, "Точные денежные суммы (NUMERIC) и стоимость, вычисляемая БД", _exact_money),
+]
+
+
+def ensure_version_table(connection):
+    connection.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (
+            версия INTEGER PRIMARY KEY,
+            описание VARCHAR(255) NOT NULL,
+            применена TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+
+
+def applied_versions(connection):
+    ensure_version_table(connection)
+    return {row[0] for row in connection.execute(text(f"SELECT версия FROM {VERSION_TABLE}"))}
+
+
+def pending_migrations(engine):
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+    return [migration for migration in MIGRATIONS if migration[0] not in applied]
+
+
+def upgrade(engine, target=None):
+    """Применение всех непримененных миграций (до версии target включительно)"""
+    applied = []
+    for version, description, apply in pending_migrations(engine):
+        if target is not None and version > target:
+            break
+        # Каждая миграция выполняется в своей транзакции вместе с записью о версии
+        with engine.begin() as connection:
+            apply(connection)
+            connection.execute(
+                text(f"INSERT INTO {VERSION_TABLE} (версия, описание) VALUES (:version, :description)"),
+                {"version": version, "description": description}
+            )
+        applied.append(version)
+    return applied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Миграции схемы Проект2")
+    parser.add_argument("command", choices=["status", "upgrade", "search-index"])
+    parser.add_argument("--url", default=DB_URI, help="Строка подключения к БД")
+    parser.add_argument("--target", type=int, help="Версия, до которой выполнить обновление")
+    args = parser.parse_args(argv)
+
+    # Миграции могут выполняться дольше обычного ограничения на запрос
+    engine = make_engine(args.url, statement_timeout=0)
+    if args.command == "status":
+        pending = pending_migrations(engine)
+        for version, description, _ in MIGRATIONS:
+            state = "ожидает" if any(version == p[0] for p in pending) else "применена"
+            print(f"{version:>3}  {state:<10} {description}")
+        if engine.dialect.name == "postgresql":
+            with engine.connect() as connection:
+                if not search_index_exists(connection):
+                    print("Индекс поиска по наименованию не создан: поиск работает перебором платежей "
+                          "пользователя (python migrations.py search-index)")
+    elif args.command == "search-index":
+        with engine.begin() as connection:
+            created = _create_search_index(connection)
+        print("Индекс поиска создан" if created else "Индекс поиска не создан")
+        return 0 if created else 1
+    else:
+        applied = upgrade(engine, args.target)
+        if applied:
+            print("Применены миграции: " + ", ".join(str(v) for v in applied))
+        else:
+            print("Схема в актуальном состоянии")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
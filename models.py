@@ -5,7 +5,10 @@ from sqlalchemy import (
     Integer,
     String,
     Date,
-    Float
+    Numeric,
+    BigInteger,
+    Computed,
+    Index
 )
 from sqlalchemy.orm import declarative_base, relationship
 
@@ -13,15 +16,29 @@ Base = declarative_base()
 
 class Платежи(Base):
     __tablename__ = 'платежи'
-    __table_args__ = {'schema': 'Проект2'}
+    __table_args__ = (
+        # Выборка платежей пользователя за период (опционально по категории) с сортировкой по дате.
+        # INCLUDE-колонки позволяют PostgreSQL отвечать на запрос списка только по индексу.
+        Index('ix_платежи_польз_дата', 'id_пользователя', 'дата', 'id',
+              postgresql_include=['id_категории', 'наименование_платежа', 'количество', 'цена', 'стоимость']),
+        Index('ix_платежи_польз_кат_дата', 'id_пользователя', 'id_категории', 'дата', 'id',
+              postgresql_include=['наименование_платежа', 'количество', 'цена', 'стоимость']),
+        # Изменения платежей пользователя после отметки синхронизации (local_cache.py)
+        Index('ix_платежи_польз_версия', 'id_пользователя', 'версия'),
+        # Триграммный GIN-индекс поиска по наименованию создается миграцией (нужен pg_trgm)
+        {'schema': 'Проект2'},
+    )
     id = Column(Integer, autoincrement=True, primary_key=True, unique=True, nullable=False)
     id_пользователя = Column(Integer, ForeignKey('Проект2.пользователи.id'))
     дата = Column(Date, nullable=False)
     id_категории = Column(Integer, ForeignKey('Проект2.категории.id'))
     наименование_платежа = Column(String(255), nullable=False)
     количество = Column(Integer, nullable=False)
-    цена = Column(Float, nullable=False)
-    стоимость = Column(Float, nullable=False)
+    # Деньги хранятся точно, в рублях с копейками; стоимость вычисляет БД (миграция 6)
+    цена = Column(Numeric(12, 2), nullable=False)
+    стоимость = Column(Numeric(14, 2), Computed("количество * цена", persisted=True), nullable=False)
+    # Отметка последнего изменения строки; заполняется БД (см. migrations.py)
+    версия = Column(BigInteger, nullable=False, server_default='0')
     
     категории = relationship("Категории", back_populates="платежи")
     пользователи = relationship("Пользователи", back_populates="платежи")
@@ -46,6 +63,31 @@ class Пользователи(Base):
     платежи = relationship("Платежи", back_populates="пользователи")
 
 
+# Свертка платежей по (пользователь, месяц, категория). Поддерживается триггерами БД
+# (см. migrations.py), проверяется и перестраивается командой rollup.py
+class ПлатежиПоМесяцам(Base):
+    __tablename__ = 'платежи_по_месяцам'
+    __table_args__ = {'schema': 'Проект2'}
+    id_пользователя = Column(Integer, ForeignKey('Проект2.пользователи.id'), primary_key=True)
+    месяц = Column(Date, primary_key=True)
+    id_категории = Column(Integer, ForeignKey('Проект2.категории.id'), primary_key=True)
+    количество = Column(Integer, nullable=False)
+    сумма = Column(Numeric(16, 2), nullable=False)
+
+
+# Удаленные платежи для синхронизации локальных копий (local_cache.py). Заполняется
+# триггером при удалении платежа или его переносе к другому пользователю
+class УдаленныеПлатежи(Base):
+    __tablename__ = 'удаленные_платежи'
+    __table_args__ = (
+        Index('ix_удаленные_платежи_польз_версия', 'id_пользователя', 'версия'),
+        {'schema': 'Проект2'},
+    )
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    id_пользователя = Column(Integer, nullable=False)
+    версия = Column(BigInteger, nullable=False)
+
+
 # Требуется разработать программное решение для учета платежей
 # физических лиц. Используя полученный программный платеж физические
 # лица могут вести учет своих платежей. Кроме того, появится возможность
@@ -87,4 +129,4 @@ class Пользователи(Base):
 # 29. Платежи группируются по категориям.
 # 30. Внутри каждой категории платежи сортируются по дате.
 # 31. В конце отчета выводится суммарная стоимость всех показанных
-# платежей.
\ No newline at end of file
+# платежей.
@@ -0,0 +1,155 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from queries import payment_key
+
+
+class PaymentTableModel(QAbstractTableModel):
+    """Модель таблицы платежей с постраничной подгрузкой по мере прокрутки.
+
+    Следующая страница запрашивается по ключу (дата, id) последней строки
+    (queries.payments_page_query), поэтому между прокрутками соединение с БД
+    не удерживается, а стоимость страницы не зависит от ее номера.
+    """
+
+    HEADERS = ["Дата", "Наименование", "Количество", "Цена", "Сумма", "Категория"]
+    CHUNK_SIZE = 200
+
+    def __init__(self, category_name=None, parent=None):
+        super().__init__(parent)
+        # Название категории по id (из справочника, без запроса к БД)
+        self.category_name = category_name or str
+        self._rows = []
+        self._fetch_next = None
+        self._fetching = False
+
+    def set_page(self, page, fetch_next=None):
+        """Замена данных первой страницей.
+
+        fetch_next(after_key, on_done, on_failed) запрашивает следующую страницу
+        (в фоне) и передает ее в on_done; on_failed() вызывается, если страница
+        не получена (ошибка или отмена запроса) - тогда ее можно запросить снова.
+        """
+        self.beginResetModel()
+        self._rows = list(page.rows) if page is not None else []
+        self._fetch_next = fetch_next if page is not None and page.has_next else None
+        self._fetching = False
+        self.endResetModel()
+
+    def clear(self):
+        self.set_page(None)
+
+    def _append_page(self, fetch_next, page):
+        if fetch_next is not self._fetch_next:
+            # Пока страница загружалась, данные были заменены
+            return
+        self._fetching = False
+        if not page.has_next:
+            self._fetch_next = None
+        if not page.rows:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page.rows) - 1)
+        self._rows.extend(page.rows)
+        self.endInsertRows()
+
+    def _fetch_failed(self, fetch_next):
+        # Страница не пришла - следующая прокрутка запросит ее снова
+        if fetch_next is self._fetch_next:
+            self._fetching = False
+
+    def insert_payment(self, payment):
+        """Вставка добавленного платежа на его место в порядке (дата, id) по убыванию.
+
+        Если место приходится на еще не загруженные страницы, платеж не
+        вставляется - он придет со следующей страницей. Возвращает номер строки или None.
+        """
+        key = (payment.дата, payment.id)
+        low, high = 0, len(self._rows)
+        while low < high:
+            middle = (low + high) // 2
+            if (self._rows[middle].дата, self._rows[middle].id) > key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == len(self._rows) and self._fetch_next is not None:
+            return None
+        self.beginInsertRows(QModelIndex(), low, low)
+        self._rows.insert(low, payment)
+        self.endInsertRows()
+        return low
+
+    def remove_payments(self, payment_ids):
+        """Удаление строк с указанными id платежей; возвращает число удаленных строк"""
+        payment_ids = set(payment_ids)
+        positions = [i for i, payment in enumerate(self._rows) if payment.id in payment_ids]
+        # Удаление подряд идущими блоками с конца, чтобы номера оставшихся не сдвигались
+        end = len(positions)
+        while end:
+            start = end - 1
+            while start and positions[start - 1] == positions[start] - 1:
+                start -= 1
+            first, last = positions[start], positions[end - 1]
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._rows[first:last + 1]
+            self.endRemoveRows()
+            end = start
+        return len(positions)
+
+    def row(self, row):
+        """Исходная строка запроса для номера строки таблицы"""
+        return self._rows[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.HEADERS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._fetch_next is not None and not self._fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.canFetchMore() or not self._rows:
+            return
+        self._fetching = True
+        fetch_next = self._fetch_next
+        fetch_next(payment_key(self._rows[-1]), lambda page: self._append_page(fetch_next, page),
+                   lambda: self._fetch_failed(fetch_next))
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            # Форматирование выполняется только для отрисовываемых ячеек
+            payment = self._rows[index.row()]
+            if column == 0:
+                return payment.дата.strftime("%d.%m.%Y")
+            if column == 1:
+                return payment.наименование_платежа
+            if column == 2:
+                return str(payment.количество)
+            if column == 3:
+                return f"{payment.цена:.2f}"
+            if column == 4:
+                return f"{payment.стоимость:.2f}"
+            if column == 5:
+                return self.category_name(payment.id_категории)
+        elif role == Qt.ItemDataRole.TextAlignmentRole:
+            if column == 0:
+                return Qt.AlignmentFlag.AlignCenter
+            if column in (2, 3, 4):
+                return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
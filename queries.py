@@ -0,0 +1,132 @@
+from collections import namedtuple
+
+from sqlalchemy import select, delete, tuple_
+
+from models import Платежи, УдаленныеПлатежи
+
+# Активный фильтр списка платежей: пользователь, период, (необязательно) категория
+# и подстрока наименования платежа
+PaymentFilter = namedtuple("PaymentFilter", "user_id date_from date_to category_id search", defaults=(None, None))
+
+# Подстрока короче трех букв не дает триграмм, и индекс поиска ее не ускоряет
+SEARCH_MIN_LENGTH = 3
+
+# Строка списка платежей в том же виде, что возвращает payments_query
+PaymentRow = namedtuple("PaymentRow", "id дата наименование_платежа количество цена стоимость id_категории")
+
+# Изменения платежей пользователя для локальной копии (db.payment_changes):
+# измененные и добавленные строки, id удаленных платежей и отметка следующей синхронизации
+PaymentChanges = namedtuple("PaymentChanges", "rows deleted_ids marker")
+
+# Страница списка платежей: строки (новые сверху) и есть ли страницы до и после нее
+PaymentPage = namedtuple("PaymentPage", "rows has_previous has_next")
+
+
+def payment_conditions(payment_filter):
+    """Условия WHERE для платежей, попадающих под фильтр"""
+    conditions = [
+        Платежи.id_пользователя == payment_filter.user_id,
+        Платежи.дата.between(payment_filter.date_from, payment_filter.date_to)
+    ]
+    if payment_filter.category_id is not None:
+        conditions.append(Платежи.id_категории == payment_filter.category_id)
+    if payment_filter.search:
+        conditions.append(search_condition(payment_filter.search))
+    return conditions
+
+
+def search_condition(search):
+    """Наименование содержит подстроку без учета регистра.
+
+    ILIKE '%...%' в PostgreSQL выполняется по триграммному индексу
+    (migrations.py); символы %, _ и \\ в подстроке ищутся буквально.
+    """
+    escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return Платежи.наименование_платежа.ilike(f"%{escaped}%", escape="\\")
+
+
+def payment_matches(payment_filter, user_id, payment_date, category_id, name):
+    """Попадает ли платеж под фильтр (те же условия, что payment_conditions, но в памяти)"""
+    return (
+        user_id == payment_filter.user_id
+        and payment_filter.date_from <= payment_date <= payment_filter.date_to
+        and (payment_filter.category_id is None or category_id == payment_filter.category_id)
+        and (not payment_filter.search or payment_filter.search.lower() in name.lower())
+    )
+
+
+def payment_key(payment):
+    """Ключ порядка списка платежей: (дата, id) - уникален, в отличие от одной даты"""
+    return (payment.дата, payment.id)
+
+
+def _payments_select(payment_filter):
+    return select(
+        Платежи.id,
+        Платежи.дата,
+        Платежи.наименование_платежа,
+        Платежи.количество,
+        Платежи.цена,
+        Платежи.стоимость,
+        Платежи.id_категории
+    ).where(*payment_conditions(payment_filter))
+
+
+def payments_query(payment_filter):
+    """Запрос списка платежей пользователя за период, новые сверху (по дате и id).
+
+    Название категории не соединяется из таблицы категорий, а подставляется
+    из справочника процесса (reference_data.categories).
+    """
+    return _payments_select(payment_filter).order_by(Платежи.дата.desc(), Платежи.id.desc())
+
+
+def payments_page_query(payment_filter, limit, after=None, before=None):
+    """Страница списка платежей по ключу (дата, id) вместо OFFSET.
+
+    after - ключ последней строки текущей страницы: следующая страница (более
+    старые платежи) в обычном порядке. before - ключ первой строки: предыдущая
+    страница, строки приходят в обратном порядке (см. db.payments_page).
+    Условие по ключу и сортировка идут по индексу (пользователь, [категория,] дата, id),
+    поэтому стоимость страницы не зависит от ее номера.
+    """
+    query = _payments_select(payment_filter)
+    key = tuple_(Платежи.дата, Платежи.id)
+    if before is not None:
+        return query.where(key > tuple_(*before)).order_by(Платежи.дата, Платежи.id).limit(limit)
+    if after is not None:
+        query = query.where(key < tuple_(*after))
+    return query.order_by(Платежи.дата.desc(), Платежи.id.desc()).limit(limit)
+
+
+def delete_payments_query(user_id, payment_ids):
+    """Удаление платежей пользователя по списку id одним запросом"""
+    return delete(Платежи).where(
+        Платежи.id_пользователя == user_id,
+        Платежи.id.in_(payment_ids)
+    )
+
+
+def changed_payments_query(user_id, since=None):
+    """Платежи пользователя, измененные начиная с отметки since (все при since=None)"""
+    query = select(
+        Платежи.id,
+        Платежи.дата,
+        Платежи.наименование_платежа,
+        Платежи.количество,
+        Платежи.цена,
+        Платежи.стоимость,
+        Платежи.id_категории,
+        Платежи.версия
+    ).where(Платежи.id_пользователя == user_id)
+    if since is not None:
+        query = query.where(Платежи.версия >= since)
+    return query
+
+
+def deleted_payments_query(user_id, since):
+    """id платежей пользователя, удаленных начиная с отметки since"""
+    return select(УдаленныеПлатежи.id).where(
+        УдаленныеПлатежи.id_пользователя == user_id,
+        УдаленныеПлатежи.версия >= since
+    )
@@ -0,0 +1,91 @@
+"""Справочники, общие для всего процесса: логины пользователей и категории.
+
+Справочник загружается из БД при первом обращении и дальше читается из
+памяти: открытие диалогов и фильтров, подпись категорий в таблице и
+отчетах не требуют запросов. Данные перечитываются после invalidate()
+(его вызывает код, изменивший таблицу) или по истечении max_age.
+"""
+import threading
+import time
+
+from sqlalchemy import select
+
+from models import Пользователи, Категории
+
+
+class ReferenceTable:
+    """Небольшая таблица-справочник id -> название"""
+
+    def __init__(self, id_column, name_column, max_age=None):
+        self.id_column = id_column
+        self.name_column = name_column
+        self.max_age = max_age
+        self._items = None
+        self._names = {}
+        self._by_name = {}
+        self._by_folded_name = {}
+        self._loaded_at = 0.0
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def _expired(self):
+        return self.max_age is not None and time.monotonic() - self._loaded_at > self.max_age
+
+    def load(self, session):
+        """Загрузка справочника, если он еще не загружен или устарел"""
+        with self._lock:
+            if self._stale or self._expired():
+                self._items = [
+                    tuple(row)
+                    for row in session.execute(
+                        select(self.id_column, self.name_column).order_by(self.name_column, self.id_column))
+                ]
+                self._names = dict(self._items)
+                self._by_name = {name: item_id for item_id, name in self._items}
+                # Без учета регистра: названия, различающиеся только регистром, дают None
+                self._by_folded_name = {}
+                for item_id, name in self._items:
+                    key = name.strip().lower()
+                    self._by_folded_name[key] = None if key in self._by_folded_name else item_id
+                self._loaded_at = time.monotonic()
+                self._stale = False
+            return self._items
+
+    def items(self, session):
+        """Список (id, название), отсортированный по названию"""
+        return self.load(session)
+
+    def find(self, session, name):
+        """id по названию или None.
+
+        Сначала ищется точное совпадение (логины уникальны с учетом регистра),
+        без учета регистра - только если такое название одно.
+        """
+        self.load(session)
+        for key in (name, name.strip()):
+            if key in self._by_name:
+                return self._by_name[key]
+        return self._by_folded_name.get(name.strip().lower())
+
+    def name(self, item_id):
+        """Название по id из уже загруженного справочника"""
+        return self._names.get(item_id, "")
+
+    def names(self, session):
+        """Словарь id -> название"""
+        self.load(session)
+        return self._names
+
+    def invalidate(self):
+        """Справочник будет перечитан при следующем обращении"""
+        with self._lock:
+            self._stale = True
+
+
+# Для окна входа хранятся только логины, без паролей и пин-кодов: учетные
+# данные выбранного пользователя читаются лишь при проверке (auth.verify_login)
+login_directory = ReferenceTable(Пользователи.id, Пользователи.логин, max_age=300)
+
+# Категории перечитываются раз в 10 минут, чтобы окно, открытое весь день,
+# увидело категории, добавленные на других рабочих местах
+categories = ReferenceTable(Категории.id, Категории.название, max_age=600)
@@ -0,0 +1,314 @@
+import io
+import math
+import os
+from xml.sax.saxutils import escape
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.platypus import (SimpleDocTemplate, BaseDocTemplate, PageTemplate, Frame, Flowable, Paragraph,
+                                Spacer, Table, TableStyle)
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+from analytics import MONTH
+from diagnostics import timed
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "DejaVuSan.ttf")
+FALLBACK_FONT = 'Helvetica'
+
+# Поля страницы; сверху - место под колонтитул с ФИО и номером страницы
+MARGIN = 50
+TOP_MARGIN = 65
+HEADER_FONT_SIZE = 8
+
+# Таблица платежей: дата, наименование, стоимость (ширина A4 без полей)
+PAYMENT_HEADER = ("Дата", "Наименование", "Стоимость")
+PAYMENT_COLUMNS = (70, 330, 95)
+CELL_FONT_SIZE = 9
+ROW_HEIGHT = 13
+# Наименования длиннее этого числа символов проверяются на ширину колонки
+# и при необходимости переносятся (Paragraph); короче - заведомо помещаются
+NAME_FIT_CHARS = 40
+
+
+def register_font(font_path=FONT_PATH):
+    """Регистрация шрифта с кириллицей; при ошибке возвращается стандартный шрифт"""
+    try:
+        pdfmetrics.registerFont(TTFont('DejaVuSan', font_path))
+        return 'DejaVuSan'
+    except Exception:
+        return FALLBACK_FONT
+
+
+class ReportTemplate:
+    """Шрифт и стили отчета, подготовленные один раз и общие для всех отчетов.
+
+    Разбор TTF-файла (~500 КБ) и создание стилей - фиксированная стоимость,
+    которая на небольших отчетах больше самой сборки документа.
+    """
+
+    def __init__(self, font_path=FONT_PATH):
+        self.font_name = register_font(font_path)
+        styles = getSampleStyleSheet()
+        self.normal_style = styles['Normal']
+
+        # Стили для отчета
+        self.title_style = ParagraphStyle(
+            'Title',
+            parent=styles['Heading1'],
+            fontName=self.font_name,
+            fontSize=16,
+            alignment=1,
+            spaceAfter=20
+        )
+
+        self.category_style = ParagraphStyle(
+            'Category',
+            parent=styles['Heading2'],
+            fontName=self.font_name,
+            fontSize=12,
+            textColor=colors.darkblue,
+            spaceAfter=5,
+            keepWithNext=1
+        )
+
+        self.item_style = ParagraphStyle(
+            'Item',
+            parent=styles['Normal'],
+            fontName=self.font_name,
+            fontSize=10,
+            spaceAfter=5
+        )
+
+        self.total_style = ParagraphStyle(
+            'Total',
+            parent=styles['Heading2'],
+            fontName=self.font_name,
+            fontSize=14,
+            textColor=colors.darkred,
+            alignment=2
+        )
+
+        # Ячейки таблиц - обычные строки; Paragraph только для длинных наименований
+        self.cell_style = ParagraphStyle(
+            'Cell',
+            parent=styles['Normal'],
+            fontName=self.font_name,
+            fontSize=CELL_FONT_SIZE,
+            leading=CELL_FONT_SIZE + 2
+        )
+
+        self.table_style = TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), self.font_name),
+            ('FONTSIZE', (0, 0), (-1, -1), CELL_FONT_SIZE),
+            ('TOPPADDING', (0, 0), (-1, -1), 1),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.darkblue),
+            ('LINEBELOW', (0, 0), (-1, 0), 0.5, colors.grey),
+        ])
+
+    @property
+    def has_cyrillic_font(self):
+        return self.font_name != FALLBACK_FONT
+
+    def name_cell(self, name):
+        """Наименование платежа: строка или, если не помещается в колонку, Paragraph с переносом"""
+        if len(name) > NAME_FIT_CHARS and pdfmetrics.stringWidth(
+                name, self.font_name, CELL_FONT_SIZE) > PAYMENT_COLUMNS[1] - 12:
+            return Paragraph(escape(name), self.cell_style)
+        return name
+
+    def table(self, header, rows, col_widths, row_heights=None):
+        return Table([header, *rows], colWidths=col_widths, rowHeights=row_heights, repeatRows=1,
+                     style=self.table_style)
+
+    def payment_table(self, rows):
+        """Таблица платежей с фиксированной высотой строк (кроме перенесенных наименований)"""
+        heights = [ROW_HEIGHT] + [None if isinstance(row[1], Paragraph) else ROW_HEIGHT for row in rows]
+        return self.table(PAYMENT_HEADER, rows, PAYMENT_COLUMNS, heights)
+
+    def warm_up(self):
+        """Пробная сборка в память: заполняет кеши ширин символов до первого настоящего отчета.
+
+        В PDF шрифт все равно встраивается подмножеством - только использованные символы.
+        """
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4)
+        doc.build([Paragraph("ОТЧЕТ О ПЛАТЕЖАХ 0123456789 абвгдеёжзийклмнопрстуфхцчшщъыьэюя", self.item_style)])
+
+
+_template = None
+
+
+def get_template():
+    """Общий для процесса шаблон отчета (создается при первом обращении)"""
+    global _template
+    if _template is None:
+        _template = ReportTemplate()
+    return _template
+
+
+class PaymentTable(Flowable):
+    """Платежи одной категории, переносимые на следующие страницы по частям.
+
+    Одна Table на тысячи строк при каждом переносе на новую страницу заново
+    обсчитывает все оставшиеся строки, и время сборки растет квадратично.
+    Здесь строки имеют фиксированную высоту, поэтому для каждой страницы
+    строится Table только из помещающихся на нее строк, а остаток становится
+    новым PaymentTable. Заголовок столбцов повторяется на каждой странице.
+    """
+
+    def __init__(self, rows, template, start=0):
+        super().__init__()
+        self.rows = rows
+        self.template = template
+        self.start = start
+        self._table = None
+        self._count = 0
+
+    def _fit(self, available_height):
+        """Table из строк, помещающихся по высоте (заголовок и count строк по ROW_HEIGHT)"""
+        # Больше страницы строк не нужно (KeepTogether обмеряет с "бесконечной" высотой)
+        count = max(1, int(min(available_height, A4[1]) // ROW_HEIGHT) - 1)
+        if self._table is None or self._count != count:
+            self._table = self.template.payment_table(self.rows[self.start:self.start + count])
+            self._count = count
+        return self._table
+
+    def wrap(self, available_width, available_height):
+        width, height = self._fit(available_height).wrap(available_width, available_height)
+        if self.start + self._count < len(self.rows):
+            # Остальные строки не помещаются - рамка разделит таблицу (split)
+            height = max(height, available_height + 1)
+        return width, height
+
+    def split(self, available_width, available_height):
+        table = self._fit(available_height)
+        if table.wrap(available_width, available_height)[1] > available_height:
+            # Перенесенные наименования выше обычной строки - делит сама Table
+            parts = table.split(available_width, available_height)
+            if not parts:
+                return []
+            table = parts[0]
+        # Заголовок столбцов и поместившиеся строки
+        rest = self.start + len(table._cellvalues) - 1
+        if rest < len(self.rows):
+            return [table, PaymentTable(self.rows, self.template, rest)]
+        return [table]
+
+    def drawOn(self, canvas, x, y, _sW=0):
+        self._table.drawOn(canvas, x, y, _sW)
+
+
+def _analysis_elements(analysis, template):
+    """Раздел анализа затрат (analytics.Analysis): итоги по периодам, доли категорий, крупнейшие статьи"""
+    periods = analysis.periods
+    monthly = analysis.period == MONTH
+    elements = [Spacer(1, 20), Paragraph("АНАЛИЗ ЗАТРАТ", template.title_style)]
+
+    elements.append(Paragraph("<b>По месяцам</b>" if monthly else "<b>По неделям</b>", template.category_style))
+    period_rows = []
+    for start, count, amount, moving in zip(periods.starts, periods.counts, periods.amounts, periods.moving_average):
+        # Пока не набралось окно, скользящее среднее - NaN
+        period_rows.append((f"{start:%m.%Y}" if monthly else f"с {start:%d.%m.%Y}", str(count), f"{amount:.2f}",
+                            "" if math.isnan(moving) else f"{moving:.2f}"))
+    elements.append(template.table(
+        ("Период", "Платежей", "Сумма", f"Скользящее среднее за {analysis.window}"), period_rows,
+        (110, 90, 120, 175)))
+
+    elements.append(Paragraph("<b>Доли категорий</b>", template.category_style))
+    elements.append(template.table(
+        ("Категория", "Платежей", "Сумма", "Доля"),
+        [(template.name_cell(share.название), str(share.количество), f"{share.сумма:.2f}", f"{share.доля:.1%}")
+         for share in analysis.categories],
+        (245, 80, 100, 70)))
+
+    elements.append(Paragraph("<b>Крупнейшие статьи затрат</b>", template.category_style))
+    elements.append(template.table(
+        ("Наименование", "Платежей", "Сумма"),
+        [(template.name_cell(item.наименование), str(item.количество), f"{item.сумма:.2f}")
+         for item in analysis.top_items],
+        PAYMENT_COLUMNS))
+    return elements
+
+
+def _page_template(template, header, progress):
+    """Страница отчета: колонтитул с ФИО и номером страницы рисуется в onPage"""
+
+    def on_page(canvas, document):
+        width, height = document.pagesize
+        y = height - TOP_MARGIN + 20
+        canvas.saveState()
+        canvas.setFont(template.font_name, HEADER_FONT_SIZE)
+        if header:
+            canvas.drawString(document.leftMargin, y, header)
+        canvas.drawRightString(width - document.rightMargin, y, f"Страница {document.page}")
+        canvas.setStrokeColor(colors.grey)
+        canvas.setLineWidth(0.5)
+        canvas.line(document.leftMargin, y - 4, width - document.rightMargin, y - 4)
+        canvas.restoreState()
+        if progress is not None:
+            progress(document.page)
+
+    return on_page
+
+
+def build_report(filename, rows, template=None, subtitle=None, analysis=None, progress=None, header=None):
+    """Формирование PDF-отчета о платежах.
+
+    rows - строки report_data.report_rows_query (уже сгруппированные
+    по категориям и отсортированные по дате). analysis - результат
+    analytics.analyse для раздела анализа затрат в конце отчета.
+    header (ФИО) выводится в колонтитуле каждой страницы рядом с номером.
+    progress(страница) вызывается в начале каждой страницы. Возвращает общий итог.
+    """
+    template = template or get_template()
+    doc = BaseDocTemplate(filename, pagesize=A4, leftMargin=MARGIN, rightMargin=MARGIN, topMargin=TOP_MARGIN,
+                          bottomMargin=MARGIN, title="Отчет о платежах", author=header or "")
+    frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id="body")
+    doc.addPageTemplates([PageTemplate(id="report", frames=[frame], onPage=_page_template(template, header, progress))])
+    elements = []
+
+    # Заголовок отчета
+    elements.append(Paragraph("ОТЧЕТ О ПЛАТЕЖАХ", template.title_style))
+    if subtitle:
+        elements.append(Paragraph(escape(subtitle), template.item_style))
+    elements.append(Spacer(1, 12))
+
+    # Данные отчета: группировка, сортировка и итоги выполняются в БД, строки
+    # читаются из курсора порциями; платежи категории - одна таблица по страницам
+    total = 0.0
+    payments = None
+    for row in rows:
+        # Категории с одинаковым названием - разные группы, итог категории считается по id
+        if payments is None or row.id_категории != current_category:
+            if payments is not None:
+                elements.append(PaymentTable(payments, template))
+                elements.append(Spacer(1, 10))
+            # Название категории и сумма
+            current_category = row.id_категории
+            elements.append(Paragraph(f"<b>{escape(row.название)}</b> - {row.итого_категории:.2f} р.",
+                                      template.category_style))
+            payments = []
+            total = row.итого
+
+        payments.append((f"{row.дата:%d.%m.%Y}", template.name_cell(row.наименование_платежа), f"{row.стоимость:.2f}"))
+
+    if payments is not None:
+        elements.append(PaymentTable(payments, template))
+        elements.append(Spacer(1, 10))
+
+    # Итоговая сумма
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph("_" * 80, template.normal_style))
+    elements.append(Paragraph(f"<b>ИТОГО:</b> {total:.2f} р.", template.total_style))
+
+    if analysis is not None and analysis.count:
+        elements.extend(_analysis_elements(analysis, template))
+
+    with timed("report.build", elements=len(elements)):
+        doc.build(elements)
+    return total
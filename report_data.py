@@ -0,0 +1,46 @@
+from collections import namedtuple
+
+from sqlalchemy import select, func
+
+from models import Платежи, Категории
+from queries import payment_conditions
+
+# Строка отчета (report_rows_query): платеж вместе с итогом своей категории и общим итогом
+ReportRow = namedtuple("ReportRow", "id_категории название дата наименование_платежа стоимость итого_категории итого")
+
+# Размер порции при потоковом чтении строк отчета
+REPORT_CHUNK_SIZE = 500
+
+
+def _report_conditions(payment_filter, payment_ids=None):
+    conditions = payment_conditions(payment_filter)
+    if payment_ids is not None:
+        conditions.append(Платежи.id.in_(payment_ids))
+    return conditions
+
+
+def report_rows_query(payment_filter, payment_ids=None):
+    """Строки отчета: по категориям, внутри категории по дате.
+
+    Итоги по категории и общий итог считаются оконными функциями и приходят
+    в каждой строке, поэтому заголовок категории можно вывести до ее платежей,
+    а сами строки читать из курсора порциями. Итоги и строки берутся из одного
+    запроса, поэтому платеж, добавленный во время чтения, не нарушит их согласованность.
+    """
+    return select(
+        Платежи.id_категории,
+        Категории.название,
+        Платежи.дата,
+        Платежи.наименование_платежа,
+        Платежи.стоимость,
+        func.sum(Платежи.стоимость).over(partition_by=Платежи.id_категории).label("итого_категории"),
+        func.sum(Платежи.стоимость).over().label("итого")
+    ).join(Категории).where(
+        *_report_conditions(payment_filter, payment_ids)
+    ).order_by(Категории.название, Платежи.id_категории, Платежи.дата, Платежи.id)
+
+
+def stream_report_rows(session, payment_filter, payment_ids=None):
+    """Потоковое чтение строк отчета (report_rows_query) без загрузки всей выборки в память"""
+    query = report_rows_query(payment_filter, payment_ids).execution_options(yield_per=REPORT_CHUNK_SIZE)
+    return session.execute(query)
@@ -0,0 +1,161 @@
+"""Формирование PDF-отчета в отдельном процессе.
+
+Сборка документа reportlab занимает процессор на все время работы, и в потоке
+интерфейса (или в потоке того же процесса, из-за GIL) окно на большом отчете
+перестает отвечать. Поэтому отчет собирается в дочернем процессе: он получает
+параметры отчета (фильтр, выбранные платежи), сам читает строки из БД через
+свое подключение, как batch_reports, и передает по каналу номер текущей
+страницы. Окно опрашивает канал по таймеру и может прервать процесс.
+
+Документ пишется во временный файл рядом с выбранным и переименовывается
+только после успешной сборки, поэтому отмена или ошибка не оставляют
+недописанный PDF и не портят существующий файл.
+"""
+import multiprocessing
+import os
+from collections import namedtuple
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+# Параметры отчета; без payment_ids отчет строится по всему фильтру и дополняется анализом затрат,
+# header (ФИО) выводится в колонтитуле каждой страницы
+ReportJob = namedtuple("ReportJob", "filename url payment_filter payment_ids subtitle header", defaults=(None, None))
+
+ReportResult = namedtuple("ReportResult", "filename pages total has_cyrillic_font")
+
+# Интервал опроса канала процесса, мс
+POLL_INTERVAL = 100
+
+
+def _part_filename(filename):
+    return filename + ".part"
+
+
+def _remove(filename):
+    try:
+        os.remove(filename)
+    except OSError:
+        pass
+
+
+def render_report(job, connection):
+    """Точка входа дочернего процесса: чтение строк из БД и сборка PDF.
+
+    В канал передаются ("pages", номер страницы), в конце - ("done", ReportResult)
+    или ("error", текст).
+    """
+    part = _part_filename(job.filename)
+    try:
+        from sqlalchemy.orm import Session
+
+        import analytics
+        from db import make_engine
+        from reference_data import categories
+        from report import build_report, get_template
+        from report_data import stream_report_rows
+
+        pages = 0
+
+        def progress(page):
+            nonlocal pages
+            pages = page
+            connection.send(("pages", page))
+
+        engine = make_engine(job.url, pool_size=1, max_overflow=0)
+        template = get_template()
+        with Session(engine) as session:
+            # Названия категорий для раздела анализа
+            categories.load(session)
+            analysis = None
+            if job.payment_ids is None:
+                analysis = analytics.analyse(analytics.load_payments(session, job.payment_filter))
+            total = build_report(part, stream_report_rows(session, job.payment_filter, job.payment_ids), template,
+                                 subtitle=job.subtitle, analysis=analysis, progress=progress,
+                                 header=job.header)
+        engine.dispose()
+        os.replace(part, job.filename)
+        connection.send(("done", ReportResult(job.filename, pages, total, template.has_cyrillic_font)))
+    except Exception as e:
+        _remove(part)
+        connection.send(("error", str(e)))
+    finally:
+        connection.close()
+
+
+class ReportProcess(QObject):
+    """Один отчет в дочернем процессе с ходом выполнения и отменой"""
+
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._process = None
+        self._connection = None
+        self._job = None
+        self._timer = QTimer(self)
+        self._timer.setInterval(POLL_INTERVAL)
+        self._timer.timeout.connect(self._poll)
+
+    @property
+    def running(self):
+        return self._process is not None
+
+    def start(self, job):
+        """Запуск сборки отчета (ReportJob); предыдущий отчет должен быть завершен"""
+        if self.running:
+            raise RuntimeError("Отчет уже формируется")
+        # spawn: fork процесса с потоками Qt и пулом соединений небезопасен
+        context = multiprocessing.get_context("spawn")
+        receiver, sender = context.Pipe(duplex=False)
+        self._process = context.Process(target=render_report, args=(job, sender), daemon=True)
+        self._process.start()
+        sender.close()
+        self._connection = receiver
+        self._job = job
+        self._timer.start()
+
+    def cancel(self):
+        """Прерывание процесса; недописанный файл удаляется"""
+        if not self.running:
+            return
+        job = self._job
+        self._process.terminate()
+        self._process.join()
+        self._stop()
+        _remove(_part_filename(job.filename))
+
+    def _stop(self):
+        self._timer.stop()
+        self._connection.close()
+        # Результат уже получен, а завершение интерпретатора процесса окно не ждет:
+        # завершившийся процесс собирается multiprocessing при следующем запуске
+        self._process.join(0)
+        self._process = self._connection = self._job = None
+
+    def _poll(self):
+        pages = None
+        try:
+            while self._connection.poll():
+                kind, value = self._connection.recv()
+                if kind == "pages":
+                    pages = value
+                    continue
+                self._stop()
+                if kind == "done":
+                    self.finished.emit(value)
+                else:
+                    self.failed.emit(value)
+                return
+        except EOFError:
+            # Процесс завершился, не сообщив результат (например, был убит)
+            self._process.join()
+            exitcode = self._process.exitcode
+            job = self._job
+            self._stop()
+            _remove(_part_filename(job.filename))
+            self.failed.emit(f"Процесс формирования отчета завершился с кодом {exitcode}")
+            return
+        if pages is not None:
+            self.progress.emit(pages)
@@ -0,0 +1,172 @@
+"""Помесячная свертка платежей: итоги за период, проверка и перестроение.
+
+Таблица Проект2.платежи_по_месяцам хранит количество и сумму платежей по
+(пользователь, месяц, категория) и поддерживается триггерами БД, поэтому
+итоги за длинный период стоят O(месяцев x категорий), а не O(платежей).
+
+Запуск:
+    python rollup.py check      # сравнение свертки с таблицей платежей
+    python rollup.py rebuild    # полное перестроение свертки
+"""
+import argparse
+import calendar
+import sys
+from datetime import timedelta
+
+from sqlalchemy import select, delete, insert, func, text, Date
+
+from db import DB_URI, make_engine
+from models import Платежи, ПлатежиПоМесяцам
+from queries import search_condition
+from reference_data import categories
+
+
+def month_start(column, dialect_name):
+    """Первое число месяца для даты в выражении SQL"""
+    if dialect_name == "sqlite":
+        return func.date(column, "start of month")
+    return func.date_trunc("month", column).cast(Date)
+
+
+def raw_totals_query(dialect_name):
+    """Свертка, посчитанная заново по таблице платежей"""
+    month = month_start(Платежи.дата, dialect_name)
+    return select(
+        Платежи.id_пользователя,
+        month.label("месяц"),
+        Платежи.id_категории,
+        func.count().label("количество"),
+        func.sum(Платежи.стоимость).label("сумма")
+    ).where(
+        Платежи.id_пользователя.is_not(None),
+        Платежи.id_категории.is_not(None)
+    ).group_by(Платежи.id_пользователя, month, Платежи.id_категории)
+
+
+def rebuild(connection):
+    """Полное перестроение свертки по таблице платежей"""
+    if connection.dialect.name == "postgresql":
+        # Изменения платежей ждут окончания перестроения, чтобы не потерять их в свертке
+        connection.execute(text('LOCK TABLE "Проект2"."платежи" IN SHARE MODE'))
+    connection.execute(delete(ПлатежиПоМесяцам))
+    connection.execute(insert(ПлатежиПоМесяцам).from_select(
+        ["id_пользователя", "месяц", "id_категории", "количество", "сумма"],
+        raw_totals_query(connection.dialect.name)
+    ))
+
+
+def check(connection):
+    """Расхождения свертки с таблицей платежей: список (ключ, ожидаемое, фактическое)"""
+    expected = {
+        (row.id_пользователя, str(row.месяц), row.id_категории): (row.количество, row.сумма)
+        for row in connection.execute(raw_totals_query(connection.dialect.name))
+    }
+    actual = {
+        (row.id_пользователя, str(row.месяц), row.id_категории): (row.количество, row.сумма)
+        for row in connection.execute(select(ПлатежиПоМесяцам))
+    }
+    differences = []
+    for key in expected.keys() | actual.keys():
+        want = expected.get(key, (0, 0))
+        have = actual.get(key, (0, 0))
+        # Суммы в NUMERIC - сравниваются точно
+        if want != have:
+            differences.append((key, want, have))
+    return sorted(differences)
+
+
+def _full_months(date_from, date_to):
+    """Границы целых месяцев внутри периода или None, если целых месяцев нет"""
+    first = date_from if date_from.day == 1 else (date_from.replace(day=28) + timedelta(days=4)).replace(day=1)
+    last_day = calendar.monthrange(date_to.year, date_to.month)[1]
+    last = date_to.replace(day=1) if date_to.day == last_day else (date_to.replace(day=1) - timedelta(days=1)).replace(day=1)
+    if first > last:
+        return None
+    return first, last
+
+
+def category_totals(session, payment_filter):
+    """Количество и сумма платежей по категориям за период фильтра.
+
+    Целые месяцы берутся из свертки, неполные крайние месяцы досчитываются
+    по платежам через индекс (пользователь, дата). При поиске по наименованию
+    свертка не подходит, и все итоги считаются по платежам. Возвращает словарь
+    id_категории -> (название, количество, сумма), упорядоченный по названию.
+    """
+    parts = []
+    filter_conditions = []
+    if payment_filter.category_id is not None:
+        filter_conditions.append(Платежи.id_категории == payment_filter.category_id)
+    if payment_filter.search:
+        filter_conditions.append(search_condition(payment_filter.search))
+
+    def raw_part(date_from, date_to):
+        return select(
+            Платежи.id_категории,
+            func.count().label("количество"),
+            func.sum(Платежи.стоимость).label("сумма")
+        ).where(
+            Платежи.id_пользователя == payment_filter.user_id,
+            Платежи.дата.between(date_from, date_to),
+            *filter_conditions
+        ).group_by(Платежи.id_категории)
+
+    months = None if payment_filter.search else _full_months(payment_filter.date_from, payment_filter.date_to)
+    if months is None:
+        parts.append(raw_part(payment_filter.date_from, payment_filter.date_to))
+    else:
+        first, last = months
+        rollup_condition = []
+        if payment_filter.category_id is not None:
+            rollup_condition.append(ПлатежиПоМесяцам.id_категории == payment_filter.category_id)
+        parts.append(select(
+            ПлатежиПоМесяцам.id_категории,
+            func.sum(ПлатежиПоМесяцам.количество).label("количество"),
+            func.sum(ПлатежиПоМесяцам.сумма).label("сумма")
+        ).where(
+            ПлатежиПоМесяцам.id_пользователя == payment_filter.user_id,
+            ПлатежиПоМесяцам.месяц.between(first, last),
+            *rollup_condition
+        ).group_by(ПлатежиПоМесяцам.id_категории))
+        if payment_filter.date_from < first:
+            parts.append(raw_part(payment_filter.date_from, first - timedelta(days=1)))
+        last_day = last.replace(day=calendar.monthrange(last.year, last.month)[1])
+        if last_day < payment_filter.date_to:
+            parts.append(raw_part(last_day + timedelta(days=1), payment_filter.date_to))
+
+    totals = {}
+    for part in parts:
+        for row in session.execute(part):
+            count, amount = totals.get(row.id_категории, (0, 0))
+            totals[row.id_категории] = (count + row.количество, amount + row.сумма)
+
+    names = categories.names(session) if totals else {}
+    ordered = sorted(totals, key=lambda category_id: (names.get(category_id, ""), category_id))
+    return {category_id: (names.get(category_id, ""), *totals[category_id]) for category_id in ordered}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Помесячная свертка платежей")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    parser.add_argument("--url", default=DB_URI, help="Строка подключения к БД")
+    args = parser.parse_args(argv)
+
+    # Перестроение и проверка читают всю таблицу платежей
+    engine = make_engine(args.url, statement_timeout=0)
+    with engine.begin() as connection:
+        if args.command == "rebuild":
+            rebuild(connection)
+            print("Свертка перестроена")
+            return 0
+        differences = check(connection)
+    for key, want, have in differences[:50]:
+        print(f"{key}: ожидается {want[0]} / {want[1]:.2f}, в свертке {have[0]} / {have[1]:.2f}")
+    if differences:
+        print(f"Расхождений: {len(differences)}. Исправление: python rollup.py rebuild")
+        return 1
+    print("Свертка согласована с таблицей платежей")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
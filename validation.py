@@ -0,0 +1,63 @@
+import re
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Правила для платежа (требования 13-20): назначение на русском языке из
+# минимум 3 букв, количество - целое положительное, цена - неотрицательная
+# Верхние границы - те же, что у полей диалога добавления (и с запасом помещаются в столбцы БД)
+MAX_QUANTITY = 999
+MAX_PRICE = Decimal('1000000')
+_CYRILLIC_LETTER = re.compile('[А-Яа-яЁё]')
+_LATIN_LETTER = re.compile('[A-Za-z]')
+KOPECK = Decimal('0.01')
+
+
+class ValidationError(ValueError):
+    pass
+
+
+def validate_payment_name(name):
+    """Назначение платежа: на русском языке, минимум 3 буквы"""
+    name = name.strip()
+    if len(_CYRILLIC_LETTER.findall(name)) < 3:
+        raise ValidationError("Наименование должно содержать минимум 3 русские буквы")
+    if _LATIN_LETTER.search(name):
+        raise ValidationError("Наименование должно быть на русском языке")
+    return name
+
+
+def validate_quantity(value):
+    """Количество: целое положительное число не больше MAX_QUANTITY"""
+    if isinstance(value, str):
+        value = value.strip()
+        # isdigit() пропускает надстрочные цифры ("²"), которые int() не разбирает
+        if not value.isdecimal():
+            raise ValidationError("Количество должно быть целым положительным числом")
+        try:
+            value = int(value)
+        except ValueError:
+            raise ValidationError("Количество должно быть целым положительным числом")
+    if value <= 0:
+        raise ValidationError("Количество должно быть целым положительным числом")
+    if value > MAX_QUANTITY:
+        raise ValidationError(f"Количество не может быть больше {MAX_QUANTITY}")
+    return value
+
+
+def validate_price(value):
+    """Цена в рублях: неотрицательная, не больше MAX_PRICE, с точностью до копейки"""
+    try:
+        price = Decimal(str(value).strip().replace(' ', '').replace(',', '.'))
+    except InvalidOperation:
+        raise ValidationError("Цена должна быть числом")
+    if not price.is_finite():
+        raise ValidationError("Цена должна быть числом")
+    if price < 0:
+        raise ValidationError("Цена не может быть отрицательной")
+    if price > MAX_PRICE:
+        raise ValidationError(f"Цена не может быть больше {MAX_PRICE}")
+    return price.quantize(KOPECK, rounding=ROUND_HALF_UP)
+
+
+def payment_cost(quantity, price):
+    """Стоимость платежа = количество * цена (для показа; в БД ее считает вычисляемая колонка)"""
+    return (quantity * price).quantize(KOPECK, rounding=ROUND_HALF_UP)
@@ -0,0 +1,106 @@
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class WorkerSignals(QObject):
+    """Сигналы фоновой задачи (QRunnable сам не может их объявлять)"""
+
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class Worker(QRunnable):
+    """Выполнение функции в пуле потоков с передачей результата в поток интерфейса"""
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+
+
+class QueryExecutor(QObject):
+    """Выполнение запросов к БД вне потока интерфейса.
+
+    Каждая задача работает в собственной сессии. Новый запрос вытесняет
+    предыдущий: выполняющийся запрос отменяется на сервере, а его результат,
+    если он все же успел прийти, не попадает в интерфейс.
+    """
+
+    busyChanged = pyqtSignal(bool)
+
+    def __init__(self, session_factory, parent=None, max_threads=2):
+        super().__init__(parent)
+        self.session_factory = session_factory
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._generation = 0
+        self._connections = {}
+
+    def submit(self, fn, on_done, on_error=None, on_cancel=None):
+        """Запуск fn(session) в фоне; on_done получит результат только актуального запроса.
+
+        Сессия закрывается сразу после выполнения fn, поэтому fn должна вернуть
+        уже прочитанные данные, а не открытый курсор. on_cancel() вызывается,
+        если запрос вытеснен или отменен и его результат отброшен.
+        """
+        self.cancel()
+        self._generation += 1
+        generation = self._generation
+
+        worker = Worker(self._run, generation, fn)
+        worker.signals.finished.connect(lambda result: self._finished(generation, result, on_done, on_cancel))
+        worker.signals.failed.connect(lambda message: self._failed(generation, message, on_error, on_cancel))
+        self.busyChanged.emit(True)
+        self.pool.start(worker)
+
+    def cancel(self):
+        """Отмена выполняющегося запроса; его результат будет отброшен"""
+        self._generation += 1
+        for connection in list(self._connections.values()):
+            # psycopg2 умеет прерывать запрос из другого потока
+            cancel = getattr(connection, "cancel", None)
+            if cancel is not None:
+                try:
+                    cancel()
+                except Exception:
+                    pass
+        self.busyChanged.emit(False)
+
+    def _run(self, generation, fn):
+        session = self.session_factory()
+        try:
+            self._connections[generation] = session.connection().connection.dbapi_connection
+            if generation != self._generation:
+                raise RuntimeError("Запрос отменен")
+            result = fn(session)
+        finally:
+            self._connections.pop(generation, None)
+            session.close()
+        return result
+
+    def _finished(self, generation, result, on_done, on_cancel):
+        if generation != self._generation:
+            # Пришел результат запроса, который уже заменен новым
+            if on_cancel is not None:
+                on_cancel()
+            return
+        self.busyChanged.emit(False)
+        on_done(result)
+
+    def _failed(self, generation, message, on_error, on_cancel):
+        if generation != self._generation:
+            if on_cancel is not None:
+                on_cancel()
+            return
+        self.busyChanged.emit(False)
+        if on_error is not None:
+            on_error(message)